@@ -0,0 +1,161 @@
+"""
+Benchmark of the tick -> MultiModel.compute -> result path on synthetic books and tick streams.
+
+    python benchmark.py --instruments 100000 --ticks 200 --output run.json
+    python benchmark.py --compare base.json run.json
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import time
+import tracemalloc
+from instrument import Instrument
+from risk_model import DiscountCurveModel, ForwardCurveModel
+from multi_model import MultiModel
+from result_cache import ResultCache
+
+MARKET_DATA_VALUES = {
+    "DiscountCurve": ["USD_1", "USD_2", "USD_3"],
+    "ForwardCurve": ["FW_1", "FW_2", "FW_3"],
+}
+
+MODEL_MIXES = {
+    "discount": [DiscountCurveModel],
+    "forward": [ForwardCurveModel],
+    "all": [DiscountCurveModel, ForwardCurveModel],
+}
+
+# metric -> True if bigger is better, used by --compare
+METRICS = {
+    "ticks_per_sec": True,
+    "instruments_per_sec": True,
+    "latency_p50_ms": False,
+    "latency_p99_ms": False,
+    "latency_p999_ms": False,
+    "peak_memory_mb": False,
+}
+
+
+def make_book(size, mix, seed=0):
+    """`mix` maps instrument type to its share of the book."""
+    rng = random.Random(seed)
+    types, weights = zip(*mix.items())
+    return [Instrument(f"I{i}", t) for i, t in enumerate(rng.choices(types, weights, k=size))]
+
+
+def make_ticks(count, change_rate, seed=0):
+    """Yields (market_data, changed_keys), each key moving on a tick with probability `change_rate`."""
+    rng = random.Random(seed)
+    market_data = {key: values[0] for key, values in MARKET_DATA_VALUES.items()}
+    yield dict(market_data), set(market_data)
+    for _ in range(count - 1):
+        changed_keys = set()
+        for key, values in MARKET_DATA_VALUES.items():
+            if rng.random() < change_rate:
+                market_data[key] = rng.choice([v for v in values if v != market_data[key]])
+                changed_keys.add(key)
+        yield dict(market_data), changed_keys
+
+
+def make_multi_model(book, models, cache_size):
+    return MultiModel(
+        [model(cache=ResultCache(cache_size) if cache_size else None) for model in MODEL_MIXES[models]],
+        book,
+    )
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+async def run_ticks(multi_model, ticks):
+    latencies, priced = [], 0
+    for market_data, changed_keys in ticks:
+        start = time.perf_counter()
+        result = await multi_model.compute(None, market_data, changed_keys)
+        latencies.append(time.perf_counter() - start)
+        priced += len(result)
+    return latencies, priced
+
+
+def run(args):
+    mix = {"bond": args.bonds, "futures": args.futures, "swap": args.other}
+    book = make_book(args.instruments, mix, args.seed)
+    ticks = list(make_ticks(args.ticks, args.change_rate, args.seed))
+
+    multi_model = make_multi_model(book, args.models, args.cache_size)
+    start = time.perf_counter()
+    latencies, priced = asyncio.run(run_ticks(multi_model, ticks))
+    elapsed = time.perf_counter() - start
+
+    # memory is measured on a separate pass, tracemalloc would skew the timings
+    tracemalloc.start()
+    asyncio.run(run_ticks(make_multi_model(book, args.models, args.cache_size), ticks))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "config": vars(args),
+        "python": platform.python_version(),
+        "ticks_per_sec": len(ticks) / elapsed,
+        "instruments_per_sec": priced / elapsed,
+        "latency_p50_ms": percentile(latencies, 0.50) * 1e3,
+        "latency_p99_ms": percentile(latencies, 0.99) * 1e3,
+        "latency_p999_ms": percentile(latencies, 0.999) * 1e3,
+        "peak_memory_mb": peak / 2 ** 20,
+    }
+
+
+def compare(base_path, new_path, threshold):
+    """Prints metric deltas between two saved runs, returns True if any regressed beyond `threshold`."""
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    regressed = False
+    for metric, higher_is_better in METRICS.items():
+        change = (new[metric] - base[metric]) / base[metric] if base[metric] else 0.0
+        worse = -change if higher_is_better else change
+        flag = "REGRESSION" if worse > threshold else ""
+        regressed |= bool(flag)
+        print(f"{metric:>20}: {base[metric]:12.3f} -> {new[metric]:12.3f} ({change:+.1%}) {flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--instruments", type=int, default=10_000)
+    parser.add_argument("--ticks", type=int, default=100)
+    parser.add_argument("--change-rate", type=float, default=0.5, help="probability a key moves on a tick")
+    parser.add_argument("--bonds", type=float, default=0.45, help="share of bonds in the book")
+    parser.add_argument("--futures", type=float, default=0.45, help="share of futures in the book")
+    parser.add_argument("--other", type=float, default=0.10, help="share of instruments no model prices")
+    parser.add_argument("--models", choices=MODEL_MIXES, default="all")
+    parser.add_argument("--cache-size", type=int, default=0, help="ResultCache size per model, 0 disables it")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="save the results as JSON")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="compare two saved runs")
+    parser.add_argument("--threshold", type=float, default=0.05, help="relative change reported as a regression")
+    args = parser.parse_args()
+
+    if args.compare:
+        raise SystemExit(1 if compare(*args.compare, args.threshold) else 0)
+
+    config = {k: v for k, v in vars(args).items() if k not in ("output", "compare", "threshold")}
+    results = run(argparse.Namespace(**config))
+    for metric in METRICS:
+        print(f"{metric:>20}: {results[metric]:12.3f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
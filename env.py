@@ -1,8 +1,15 @@
 import contextvars
 from contextlib import contextmanager
-from copy import deepcopy
 
-_env_context = contextvars.ContextVar("env", default={})
+class _Layer:
+    """One immutable scope of the environment, chained to the scope it was entered in."""
+    __slots__ = ('values', 'parent')
+
+    def __init__(self, values, parent):
+        self.values = values
+        self.parent = parent
+
+_env_context = contextvars.ContextVar("env", default=None)
 
 class Env:
     def __init__(self, **kwargs):
@@ -10,16 +17,21 @@ class Env:
         self._token = None
 
     def __enter__(self):
-        current_env = deepcopy(_env_context.get())
-        current_env.update(self._new_values)
-        self._token = _env_context.set(current_env)
+        # entering only pushes a layer, the enclosing scopes are shared rather than copied
+        self._token = _env_context.set(_Layer(self._new_values, _env_context.get()))
+        return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         _env_context.reset(self._token)
 
     @classmethod
     def get(cls, key, default=None):
-        return _env_context.get().get(key, default)
+        layer = _env_context.get()
+        while layer is not None:
+            if key in layer.values:
+                return layer.values[key]
+            layer = layer.parent
+        return default
 
     def __getattr__(self, item):
-        return self.get(item)
\ No newline at end of file
+        return self.get(item)
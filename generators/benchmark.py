@@ -0,0 +1,119 @@
+"""
+operators: throughput of the push based operators, in events per second through each pipeline.
+loop: wall time of EventLoop against asyncio on the same mix of compute and sleep tasks.
+
+    python benchmark.py [--suite all] [--events 1000000] [--repeat 3] [--tasks 100000] [--rounds 5] [--work 50]
+"""
+import argparse
+import asyncio
+import time
+import operators as op
+from coroutine import coroutine
+from event_loop import EventLoop, Sleep
+
+def pipelines():
+    consume = [0].append        # cheap terminal, keeps the sink from being optimized into nothing
+    return {
+        'baseline: plain function calls': None,
+        'sink': lambda: op.sink(consume),
+        'mapTo -> sink': lambda: op.mapTo(abs, op.sink(consume)),
+        'mapTo -> where -> sink': lambda: op.mapTo(abs, op.where(bool, op.sink(consume))),
+        'window(10) -> sink': lambda: op.window(10, op.sink(consume)),
+        'batch(100) -> sink': lambda: op.batch(100, op.sink(consume)),
+        'batchByTime(1ms) -> sink': lambda: op.batchByTime(0.001, op.sink(consume)),
+        'conflate(1ms, key) -> sink': lambda: op.conflate(0.001, op.sink(consume), key=lambda x: x & 63),
+        'fanout(3 sinks)': lambda: op.fanout(*(op.sink(consume) for _ in range(3))),
+    }
+
+def eventsPerSecond(build, events, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        if build is None:
+            # what mapTo -> sink costs without generators in between
+            sink = [0].append
+            start = time.perf_counter()
+            for event in range(events):
+                sink(abs(event))
+        else:
+            pipeline = build()
+            pipeline.prime()
+            send = pipeline.send
+            start = time.perf_counter()
+            for event in range(events):
+                send(event)
+            pipeline.close()
+        best = min(best, time.perf_counter() - start)
+    return events / best
+
+def runOperators(args):
+    for label, build in pipelines().items():
+        rate = eventsPerSecond(build, args.events, args.repeat)
+        print(f'{label:>32}: {rate / 1e6:8.2f} M events/s')
+
+# every round computes then either sleeps (up to 1ms) or just yields to the other tasks
+def _sleepFor(i, r):
+    return 0.0001 * (i % 10) if (i + r) % 2 else None
+
+@coroutine
+def mixedTask(i, rounds, work):
+    for r in range(rounds):
+        total = sum(range(work))
+        duration = _sleepFor(i, r)
+        if duration is None:
+            yield
+        else:
+            yield Sleep(duration)
+    return total
+
+async def mixedAsyncTask(i, rounds, work):
+    for r in range(rounds):
+        total = sum(range(work))
+        duration = _sleepFor(i, r)
+        await asyncio.sleep(0 if duration is None else duration)
+    return total
+
+def runEventLoop(args, stats):
+    start = time.perf_counter()
+    loop = EventLoop([mixedTask(i, args.rounds, args.work) for i in range(args.tasks)], stats=stats)
+    loop.run()
+    return time.perf_counter() - start, loop
+
+def runAsyncio(args):
+    async def runAll():
+        await asyncio.gather(*(mixedAsyncTask(i, args.rounds, args.work) for i in range(args.tasks)))
+
+    start = time.perf_counter()
+    asyncio.run(runAll())
+    return time.perf_counter() - start
+
+def runLoops(args):
+    resumes = args.tasks * (args.rounds + 1)
+    elapsed = min(runEventLoop(args, stats=False)[0] for _ in range(args.repeat))
+    print(f'{"EventLoop":>32}: {elapsed:8.3f} s  {resumes / elapsed / 1e3:8.1f} k resumes/s')
+
+    elapsed, loop = min((runEventLoop(args, stats=True) for _ in range(args.repeat)), key=lambda run: run[0])
+    stats = loop.stats()
+    print(f'{"EventLoop(stats=True)":>32}: {elapsed:8.3f} s  {resumes / elapsed / 1e3:8.1f} k resumes/s  '
+          f'utilization {stats["utilization"]:.1%}  latency mean {stats["meanLatency"] * 1e3:.2f} ms '
+          f'max {stats["maxLatency"] * 1e3:.2f} ms')
+
+    elapsed = min(runAsyncio(args) for _ in range(args.repeat))
+    print(f'{"asyncio":>32}: {elapsed:8.3f} s  {resumes / elapsed / 1e3:8.1f} k resumes/s')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--suite', choices=['operators', 'loop', 'all'], default='all')
+    parser.add_argument('--events', type=int, default=1_000_000, help='events pushed through each pipeline')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--tasks', type=int, default=100_000, help='tasks run by each loop')
+    parser.add_argument('--rounds', type=int, default=5, help='compute + sleep/yield rounds per task')
+    parser.add_argument('--work', type=int, default=50, help='size of the sum computed every round')
+    args = parser.parse_args()
+
+    if args.suite in ('operators', 'all'):
+        runOperators(args)
+    if args.suite in ('loop', 'all'):
+        runLoops(args)
+
+if __name__ == '__main__':
+    main()
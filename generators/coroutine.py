@@ -1,4 +1,5 @@
 import functools
+import inspect
 
 class Coroutine:
     '''
@@ -20,14 +21,27 @@ class Coroutine:
         reprStr += ')'
         return reprStr
 
-    def send(self, input):
+    def prime(self):
         '''
-        send method that calls next() on the generator before sending the input
-        to address the double send problem
+        runs a generator that was not started yet to its first yield and returns what it yielded.
+        Afterwards send goes straight to the generator's send
         '''
-        next(self.task)
-        res = self.task.send(input)        
+        res = None
+        if inspect.getgeneratorstate(self.task) == inspect.GEN_CREATED:
+            res = next(self.task)
+        self.send = self.task.send
         return res
+
+    def send(self, input):
+        '''
+        send method that primes the generator on the first call only, to address
+        the double send problem
+        '''
+        self.prime()
+        return self.task.send(input)
+
+    def close(self):
+        self.task.close()
     
     def __iter__(self):
         return iter(self.task)
@@ -1,15 +1,217 @@
+import heapq
+import itertools
+import selectors
+import time
+from collections import deque
 from coroutine import Coroutine
+
+class Sleep:
+    '''
+    request a task yields to the loop to be parked until `duration` seconds have passed
+    '''
+    __slots__ = ('duration',)
+
+    def __init__(self, duration):
+        self.duration = duration
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.duration})'
+
+class WaitReadable:
+    '''
+    request a task yields to the loop to be parked until `fd` (a file descriptor or an object with fileno()) is readable
+    '''
+    __slots__ = ('fd',)
+    event = selectors.EVENT_READ
+
+    def __init__(self, fd):
+        self.fd = fd if isinstance(fd, int) else fd.fileno()
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.fd})'
+
+class WaitWritable(WaitReadable):
+    '''
+    request a task yields to the loop to be parked until `fd` is writable
+    '''
+    __slots__ = ()
+    event = selectors.EVENT_WRITE
+
+class TaskStats:
+    __slots__ = ('runTime', 'resumes', 'latency', 'maxLatency', 'readyAt')
+
+    def __init__(self):
+        self.runTime = 0.0          # seconds spent inside the task's next()
+        self.resumes = 0
+        self.latency = 0.0          # total seconds between being made ready and being resumed
+        self.maxLatency = 0.0
+        self.readyAt = None
+
+    @property
+    def meanLatency(self):
+        return self.latency / self.resumes if self.resumes else 0.0
+
+    def snapshot(self):
+        return {
+            'runTime': self.runTime,
+            'resumes': self.resumes,
+            'meanLatency': self.meanLatency,
+            'maxLatency': self.maxLatency,
+        }
+
 class EventLoop:
-    def __init__(self, tasks):
-        self.tasks = {t: None for t in tasks}
-        self.pending = tasks
+    '''
+    Runs generator based tasks: each next() runs a task up to its next yield.
+    Tasks that yield a Sleep are parked on a timer heap until their deadline, tasks that yield a
+    WaitReadable/WaitWritable are parked on a selector until their fd is ready, tasks that yield
+    anything else stay ready and are resumed on the next pass. When no task is ready the loop
+    blocks in the selector until an fd is ready or the earliest deadline.
+
+    With stats=True every resume is timed, see stats(). Without it the loop runs uninstrumented.
+    '''
+    def __init__(self, tasks=(), stats=False):
+        self.tasks = {}                 # task -> last value it yielded, or its return value
+        self._ready = deque()
+        self._timers = []               # heap of (deadline, sequence, task), sequence breaks ties in FIFO order
+        self._sequence = itertools.count()
+        self._selector = selectors.DefaultSelector()
+        self._io = {}                   # fd -> {event: task waiting for it}
+        self._makeReady = self._ready.append
+        self._step = self._resume
+        self.taskStats = None           # task -> TaskStats, with stats=True
+        if stats:
+            self.taskStats = {}
+            self._busy = 0.0            # seconds spent resuming tasks
+            self._wall = 0.0            # seconds spent in run()
+            self._makeReady = self._makeReadyTimed
+            self._step = self._timedResume
+        for task in tasks:
+            self.spawn(task)
+
+    def spawn(self, task):
+        self.tasks[task] = None
+        if self.taskStats is not None:
+            self.taskStats[task] = TaskStats()
+        self._makeReady(task)
+
+    @property
+    def pending(self):
+        return len(self._ready) + len(self._timers) + sum(len(waiters) for waiters in self._io.values())
 
     def run(self):
-        while self.pending:
-            for task in self.pending:
-                try:
-                    self.tasks[task] = next(task)
-                except StopIteration as si:
-                    if len(si.args):
-                        self.tasks[task] = si.args[0]
-                    self.pending.remove(task)
\ No newline at end of file
+        if self.taskStats is not None:
+            start = time.perf_counter()
+            try:
+                self._run()
+            finally:
+                self._wall += time.perf_counter() - start
+        else:
+            self._run()
+
+    def stats(self):
+        '''
+        loop wide statistics, per task ones are in taskStats. utilization is the share of the time
+        spent in run() that went to resuming tasks rather than waiting or scheduling
+        '''
+        if self.taskStats is None:
+            raise RuntimeError('EventLoop was created without stats=True')
+        resumes = sum(stats.resumes for stats in self.taskStats.values())
+        latency = sum(stats.latency for stats in self.taskStats.values())
+        return {
+            'tasks': len(self.taskStats),
+            'resumes': resumes,
+            'busy': self._busy,
+            'wall': self._wall,
+            'utilization': self._busy / self._wall if self._wall else 0.0,
+            'meanLatency': latency / resumes if resumes else 0.0,
+            'maxLatency': max((stats.maxLatency for stats in self.taskStats.values()), default=0.0),
+        }
+
+    def _run(self):
+        while self._ready or self._timers or self._io:
+            if self._ready:
+                timeout = 0                 # only poll the fds
+            elif self._timers:
+                timeout = max(self._timers[0][0] - time.monotonic(), 0)
+            else:
+                timeout = None              # only I/O left, block until an fd is ready
+            self._wait(timeout)
+            self._wakeTimers()
+            # only the tasks ready at the start of the pass run, tasks they make ready wait for the next one
+            for _ in range(len(self._ready)):
+                self._step(self._ready.popleft())
+
+    def _wait(self, timeout):
+        if not self._io:
+            # some selectors (e.g. select on Windows) fail without any fd registered
+            if timeout:
+                time.sleep(timeout)
+            return
+        for key, mask in self._selector.select(timeout):
+            waiters = self._io[key.fd]
+            for event in (selectors.EVENT_READ, selectors.EVENT_WRITE):
+                if mask & event and event in waiters:
+                    self._makeReady(waiters.pop(event))
+            self._register(key.fd, waiters)
+
+    def _waitFor(self, request, task):
+        waiters = self._io.get(request.fd, {})
+        if request.event in waiters:
+            raise RuntimeError(f'{waiters[request.event]} is already waiting for {request!r}')
+        waiters[request.event] = task
+        self._register(request.fd, waiters)
+
+    def _register(self, fd, waiters):
+        events = 0
+        for event in waiters:
+            events |= event
+        registered = fd in self._io
+        if not events:
+            del self._io[fd]
+            self._selector.unregister(fd)
+        elif registered:
+            self._selector.modify(fd, events)
+        else:
+            self._io[fd] = waiters
+            self._selector.register(fd, events)
+
+    def _wakeTimers(self):
+        now = time.monotonic()
+        timers = self._timers
+        while timers and timers[0][0] <= now:
+            self._makeReady(heapq.heappop(timers)[2])
+
+    def _makeReadyTimed(self, task):
+        self.taskStats[task].readyAt = time.perf_counter()
+        self._ready.append(task)
+
+    def _timedResume(self, task):
+        stats = self.taskStats[task]
+        start = time.perf_counter()
+        latency = start - stats.readyAt
+        stats.latency += latency
+        if latency > stats.maxLatency:
+            stats.maxLatency = latency
+        try:
+            self._resume(task)
+        finally:
+            elapsed = time.perf_counter() - start
+            stats.runTime += elapsed
+            stats.resumes += 1
+            self._busy += elapsed
+
+    def _resume(self, task):
+        try:
+            request = next(task)
+        except StopIteration as si:
+            # a task returning nothing keeps the last value it yielded
+            if si.args:
+                self.tasks[task] = si.value
+            return
+        if isinstance(request, Sleep):
+            heapq.heappush(self._timers, (time.monotonic() + request.duration, next(self._sequence), task))
+        elif isinstance(request, WaitReadable):
+            self._waitFor(request, task)
+        else:
+            self.tasks[task] = request
+            self._makeReady(task)
@@ -1,18 +1,17 @@
 import time
 from coroutine import coroutine
-from event_loop import EventLoop
+from event_loop import EventLoop, Sleep
 from lib.logging import logger
 from lib.time import Timer
 
 @coroutine
 def sleep(duration):
-    import time
+    '''
+    parks the task on the loop's timer heap instead of polling the clock
+    '''
     start = time.time()
-    while True:
-        now = time.time()
-        if now >= start+duration:
-            return f'slept for ~ {now-start} seconds'
-        yield
+    yield Sleep(duration)
+    return f'slept for ~ {time.time()-start} seconds'
 
 @coroutine
 def work(input):
@@ -0,0 +1,80 @@
+'''
+Non-blocking I/O coroutines for EventLoop tasks, used with yield from:
+
+    data = yield from recv(sock, 4096)
+
+Each helper tries the operation right away and only parks the task on the loop's selector
+when it would block. File descriptors and sockets have to be put in non-blocking mode first
+(setNonBlocking).
+'''
+import os
+from coroutine import coroutine
+from event_loop import WaitReadable, WaitWritable
+
+def setNonBlocking(fd):
+    if isinstance(fd, int):
+        os.set_blocking(fd, False)
+    else:
+        fd.setblocking(False)
+    return fd
+
+@coroutine
+def read(fd, size):
+    '''
+    reads up to `size` bytes from a file descriptor (e.g. a pipe), b'' at end of file
+    '''
+    while True:
+        try:
+            return os.read(fd, size)
+        except BlockingIOError:
+            yield WaitReadable(fd)
+
+@coroutine
+def write(fd, data):
+    '''
+    writes all of `data` to a file descriptor, returns the number of bytes written
+    '''
+    view = memoryview(data)
+    while view:
+        try:
+            view = view[os.write(fd, view):]
+        except BlockingIOError:
+            yield WaitWritable(fd)
+    return len(data)
+
+@coroutine
+def recv(sock, size):
+    '''
+    receives up to `size` bytes from a socket, b'' once the peer closed it
+    '''
+    while True:
+        try:
+            return sock.recv(size)
+        except BlockingIOError:
+            yield WaitReadable(sock)
+
+@coroutine
+def sendall(sock, data):
+    '''
+    sends all of `data` on a socket, returns the number of bytes sent
+    '''
+    view = memoryview(data)
+    while view:
+        try:
+            view = view[sock.send(view):]
+        except BlockingIOError:
+            yield WaitWritable(sock)
+    return len(data)
+
+@coroutine
+def accept(sock):
+    '''
+    accepts a connection on a listening socket, the connection is returned in non-blocking mode
+    '''
+    while True:
+        try:
+            conn, address = sock.accept()
+        except BlockingIOError:
+            yield WaitReadable(sock)
+        else:
+            return setNonBlocking(conn), address
@@ -0,0 +1,178 @@
+'''
+Push based streaming operators built on Coroutine. Each operator is a stage that receives
+items through send() and pushes its output to `target`, the next stage:
+
+    pipeline = mapTo(parse, where(isValid, batch(100, sink(publish))))
+    for tick in ticks:
+        pipeline.send(tick)
+    pipeline.close()        # flushes partial batches/windows and closes every stage downstream
+
+Stages prime their target when they are primed themselves and then push through the
+generator's own send, so an item crosses a stage with one generator resume and no
+intermediate containers. Time based stages only look at the clock when an item arrives:
+a stream that goes quiet keeps its pending batch until the next item or close().
+'''
+import functools
+import time
+from collections import deque
+from coroutine import Coroutine
+
+class Stage(Coroutine):
+    '''
+    Coroutine of an operator. close() on a stage that never received an item starts it first,
+    so its finally block runs and the stages downstream are closed (and flushed) too
+    '''
+    def close(self):
+        self.prime()
+        self.task.close()
+
+def stage(func):
+    '''
+    decorator that returns a Stage object
+    '''
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return Stage(func, *args, **kwargs)
+    return wrapper
+
+def _connect(target):
+    target.prime()
+    return target.send
+
+@stage
+def sink(func):
+    '''
+    end of a pipeline, calls func(item) for every item
+    '''
+    while True:
+        func((yield))
+
+@stage
+def mapTo(func, target):
+    '''
+    pushes func(item) for every item
+    '''
+    send = _connect(target)
+    try:
+        while True:
+            send(func((yield)))
+    finally:
+        target.close()
+
+@stage
+def where(predicate, target):
+    '''
+    pushes the items for which predicate(item) is true
+    '''
+    send = _connect(target)
+    try:
+        while True:
+            item = yield
+            if predicate(item):
+                send(item)
+    finally:
+        target.close()
+
+@stage
+def window(size, target):
+    '''
+    sliding window over the last `size` items, pushed on every item once it is full.
+    The same deque is pushed every time, copy it to keep it
+    '''
+    send = _connect(target)
+    items = deque(maxlen=size)
+    append = items.append
+    try:
+        while True:
+            append((yield))
+            if len(items) == size:
+                send(items)
+    finally:
+        target.close()
+
+@stage
+def batch(size, target):
+    '''
+    pushes lists of `size` items, the last partial one on close()
+    '''
+    send = _connect(target)
+    items = []
+    try:
+        while True:
+            items.append((yield))
+            if len(items) >= size:
+                send(items)
+                items = []
+    except GeneratorExit:
+        if items:
+            send(items)
+        raise
+    finally:
+        target.close()
+
+@stage
+def batchByTime(interval, target, clock=time.monotonic):
+    '''
+    pushes the items received within `interval` seconds of the first one of the batch,
+    once an item arrives after that (or on close())
+    '''
+    send = _connect(target)
+    items = []
+    deadline = None
+    try:
+        while True:
+            item = yield
+            now = clock()
+            if items and now >= deadline:
+                send(items)
+                items = []
+            if not items:
+                deadline = now + interval
+            items.append(item)
+    except GeneratorExit:
+        if items:
+            send(items)
+        raise
+    finally:
+        target.close()
+
+@stage
+def conflate(interval, target, key=None, clock=time.monotonic):
+    '''
+    keeps only the latest item (per key(item) when key is given) and pushes the latest ones,
+    in the order their keys were first seen, at most once every `interval` seconds (and on close())
+    '''
+    send = _connect(target)
+    latest = {}
+    nextPush = clock() + interval
+    try:
+        while True:
+            item = yield
+            latest[None if key is None else key(item)] = item
+            now = clock()
+            if now >= nextPush:
+                for value in latest.values():
+                    send(value)
+                latest.clear()
+                nextPush = now + interval
+    except GeneratorExit:
+        for value in latest.values():
+            send(value)
+        raise
+    finally:
+        target.close()
+
+@stage
+def fanout(*targets):
+    '''
+    pushes every item to all the targets, in order
+    '''
+    sends = tuple(_connect(target) for target in targets)
+    try:
+        while True:
+            item = yield
+            for send in sends:
+                send(item)
+    finally:
+        for target in targets:
+            target.close()
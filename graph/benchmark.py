@@ -0,0 +1,57 @@
+"""
+Microbenchmarks of graph node access on MyGraph: cache hits, misses, set() and instantiation.
+
+    python benchmark.py [--repeat 5]
+"""
+import argparse
+import timeit
+from examples import MyGraph
+
+
+def timePerCall(func, repeat):
+    """Best of `repeat` runs, in nanoseconds per call."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e9
+
+
+def benchmarks():
+    g = MyGraph()
+    g.F()
+    g.C()
+    g.D(3)
+    cache = g._cache
+    values = iter(range(10**12))
+
+    def missC():
+        # set() marks B and C stale, C() then recomputes both
+        g.A.set(next(values))
+        return g.C()
+
+    def cutoffC():
+        # set() to the value A already has: C() restores B and C without recomputing them
+        g.A.set(g.A())
+        return g.C()
+
+    return {
+        'baseline: dict lookup': lambda: cache['C'],
+        'hit: g.C()': lambda: g.C(),
+        'hit: g.D(3)': lambda: g.D(3),
+        'set: g.A.set(v)': lambda: g.A.set(next(values)),
+        'miss: g.A.set(v); g.C()': missC,
+        'cutoff: g.A.set(same); g.C()': cutoffC,
+        'instantiate: MyGraph()': MyGraph,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    for label, func in benchmarks().items():
+        print(f'{label:>32}: {timePerCall(func, args.repeat):10.1f} ns')
+
+
+if __name__ == '__main__':
+    main()
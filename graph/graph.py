@@ -1,67 +1,511 @@
 import ast
+import asyncio
 import inspect
-from collections import deque
+import textwrap
+from collections import deque, namedtuple, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from lib.logging import logger, SuppressLogging, DEBUG
+try:
+    from .profiler import GraphProfiler
+    from .snapshot import loadSnapshot, saveSnapshot
+    from .toposort import kahnToposortLevels
+except ImportError:
+    # graph/ itself is on sys.path (examples, notebooks): the sibling modules are imported flat
+    from profiler import GraphProfiler
+    from snapshot import loadSnapshot, saveSnapshot
+    from toposort import kahnToposortLevels
+
+_missing = object()
+# separates positional from keyword arguments in a cache key, as functools does. A constant rather than
+# an object() so keys pickled in a snapshot still match after a reload
+_kwargsMark = ('graph.kwargs',)
+NodeCacheInfo = namedtuple('NodeCacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+def _sameValue(old, new):
+    # values that cannot be compared to a single bool (e.g. arrays) count as changed
+    if old is new:
+        return True
+    try:
+        return bool(old == new)
+    except Exception:
+        return False
 
 class GraphNode:
     """Graph Node"""
-    def __init__(self, func, settable=False):
+    def __init__(self, func, settable=False, maxsize=128, offload=False, dependsOn=None):
         self.func = func
         self.name = func.__name__
         self.settable = settable
+        self.maxsize = maxsize
+        self.offload = offload
+        self.dependsOn = None if dependsOn is None else set(dependsOn)
+        # async nodes can only be computed by Graph.evaluate, a plain read would cache the coroutine
+        self.isAsync = inspect.iscoroutinefunction(func)
+        # nodes taking arguments besides self are memoized per argument tuple
+        self.parameterized = len(inspect.signature(func).parameters) > 1
+        if settable and self.parameterized:
+            raise TypeError(f'settable graph_node {self.name} cannot take arguments')
 
     def __get__(self, instance, owner):
         if instance is None:
             return self
 
-        # Return a callable wrapper so g.A() still works
-        def caller(*args, **kwargs):
+        # The accessor is built once per instance and stored in the instance __dict__, which takes
+        # precedence over this (non-data) descriptor: later lookups of g.A never come back here.
+        caller = self._makeAccessor(instance)
+        instance.__dict__[self.name] = caller
+        return caller
 
-            logger.debug(f'[GraphNode] looking for {self.func} in cache')
-            if self.name in instance._cache:
-                logger.debug(f'[GraphNode] found {self.func} in cache')
-                return instance._cache[self.name]
+    def _makeAccessor(self, instance):
+        name, cache, read = self.name, instance._cache, self._read
+        readStack = instance._readStack
 
-            result = self.func(instance, *args, **kwargs)
+        # Return a callable wrapper so g.A() still works
+        if instance.dynamicDependencies:
+            def caller(*args, **kwargs):
+                if readStack:
+                    readStack[-1].add(name)
+                return read(instance, args, kwargs)
+        elif self.parameterized:
+            def caller(*args, **kwargs):
+                return read(instance, args, kwargs)
+        else:
+            # cache hit costs a dict lookup, everything else is on the miss path
+            def caller(*args, **kwargs):
+                try:
+                    return cache[name]
+                except KeyError:
+                    return read(instance, args, kwargs)
 
-            logger.debug(f'[GraphNode] adding {self.func}: {result} in cache')
-            instance._cache[self.name] = result
-            return result
+        if instance._profiler is not None:
+            caller = instance._profiler.wrap(name, caller)
 
         # Attach .set() if settable
         if self.settable:
             def setter(value):
-                instance._cache[self.name] = value
-                instance.invalidate(self.name)
-                logger.debug(f'[GraphNode] {self.func} invalidated')
+                instance._setInput(name, value)
+                logger.debug('[GraphNode] %s set, dependents marked stale', name)
             caller.set = setter
 
         return caller
 
+    def _read(self, instance, args, kwargs):
+        if self.parameterized:
+            return self._callWithArgs(instance, args, kwargs)
+
+        if self.name in instance._cache:
+            return instance._cache[self.name]
+
+        if self.name in instance._stale:
+            instance._refresh(self.name)
+            return instance._cache[self.name]
+
+        if instance._loadFromSnapshot(self.name):
+            return instance._cache[self.name]
+
+        result = self._evaluate(instance, args, kwargs)
+
+        logger.debug('[GraphNode] adding %s: %s in cache', self.name, result)
+        instance._store(self.name, result)
+        return result
+
+    def _evaluate(self, instance, args, kwargs):
+        if self.isAsync:
+            raise TypeError(f'async graph_node {self.name} has to be computed with Graph.evaluate')
+        if instance._profiler is not None:
+            with instance._profiler.timing(self.name):
+                return self._call(instance, args, kwargs)
+        return self._call(instance, args, kwargs)
+
+    def _call(self, instance, args, kwargs):
+        if not instance.dynamicDependencies:
+            return self.func(instance, *args, **kwargs)
+
+        # record which nodes this evaluation actually reads
+        reads = set()
+        instance._readStack.append(reads)
+        try:
+            return self.func(instance, *args, **kwargs)
+        finally:
+            instance._readStack.pop()
+            instance._addDynamicDependencies(self.name, reads)
+
+    def _callWithArgs(self, instance, args, kwargs):
+        # all argument variants of a node live in one LRU under the node's name,
+        # so invalidating the node drops every variant at once
+        key = args + (_kwargsMark, *sorted(kwargs.items())) if kwargs else args
+        if self.name in instance._stale:
+            instance._refresh(self.name)
+        variants = instance._cache.get(self.name)
+        if variants is None and instance._loadFromSnapshot(self.name):
+            variants = instance._cache[self.name]
+        if variants is None:
+            variants = OrderedDict()
+            instance._store(self.name, variants)
+        stats = instance._cacheStats.setdefault(self.name, [0, 0])
+
+        try:
+            result = variants[key]
+        except KeyError:
+            pass
+        except TypeError:
+            logger.debug('[GraphNode] unhashable arguments for %s, not cached', self.name)
+            return self.func(instance, *args, **kwargs)
+        else:
+            stats[0] += 1
+            variants.move_to_end(key)
+            return result
+
+        stats[1] += 1
+        result = self._evaluate(instance, args, kwargs)
+        logger.debug('[GraphNode] adding %s%s: %s in cache', self.name, args, result)
+        variants[key] = result
+        if self.maxsize is not None and len(variants) > self.maxsize:
+            variants.popitem(last=False)
+        return result
 
-def graph_node(settable=False):
+
+def graph_node(settable=False, maxsize=128, offload=False, dependsOn=None):
     """ graph_node decorator
         input:
         ------
         settable: bool, if True, the node can be set with syntax: node.attr(value)
+        maxsize: int, number of argument variants kept for a node that takes arguments (None for unbounded)
+        offload: bool, if True, Graph.evaluate runs the node on its executor (CPU heavy nodes)
+        dependsOn: names of the nodes it reads, replaces the dependencies found in its source (nodes built dynamically)
     """
-    def decorator(func): return GraphNode(func, settable=settable)
+    def decorator(func):
+        return GraphNode(func, settable=settable, maxsize=maxsize, offload=offload, dependsOn=dependsOn)
     return decorator
 
+def _evaluateRemote(graph, node):
+    # runs in a worker process on a pickled copy of the graph, whose dependencies are already cached
+    return getattr(type(graph), node).func(graph)
+
 class Graph:
+    # when True, invalidation follows the dependencies each node read on its last evaluation
+    # instead of the static (AST based, over-approximated) ones. Set it before the first node access.
+    dynamicDependencies = False
+
     def __init__(self):
         logger.debug('[Graph] __init__ start')
         self._cache = {}
-        self._dependencies = self.getDependencyGraph()          # node -> set of dependencies
-        self._dependents = self.getReverseDependencyGraph(self._dependencies)     # node -> set of dependents
+        self._readStack = []            # one set of read nodes per evaluation in progress (dynamic mode)
+        self._dynDependencies = {}      # node -> nodes it read (dynamic mode), direct edges only
+        self._dynDependents = {}        # node -> nodes that read it (dynamic mode), direct edges only
+        self._cacheStats = {}   # parameterized node -> [hits, misses], kept across invalidations
+        # invalidation is lazy: affected nodes move from _cache to _stale and are checked on their next read
+        self._stale = {}                # node -> value it had when it was marked stale
+        self._mustRecompute = set()     # stale nodes invalidated explicitly, never restored from _stale
+        self._revision = 0              # bumped on every invalidation
+        self._changedAt = {}            # node -> revision its value last changed at
+        self._verifiedAt = {}           # node -> revision its cached value was last computed or verified at
+        self._batchDepth = 0
+        self._pendingSets = {}          # node -> value set inside a batch, applied when the batch commits
+        self._snapshot = None           # GraphSnapshot the graph was warm started from, read lazily
+        self._profiler = None           # GraphProfiler, see enableProfiling
+        # the maps are built once per class and shared by all its instances, do not mutate them
+        self._directDependencies, self._dependencies, self._dependents = self.getDependencyMaps()
         logger.debug('[Graph] __init__ end')
 
+    def _accessorNames(self):
+        # node accessors cached in the instance __dict__, rebuilt by GraphNode.__get__ on first access
+        cls = type(self)
+        return [k for k in self.__dict__ if isinstance(getattr(cls, k, None), GraphNode)]
+
+    def __getstate__(self):
+        # accessors are closures, and the snapshot holds an open memory map: values not loaded yet are not carried over
+        accessors = self._accessorNames()
+        state = {k: v for k, v in self.__dict__.items() if k not in accessors}
+        state['_snapshot'] = None
+        return state
+
+    def enableProfiling(self):
+        """
+        Starts recording per node calls, hits, self and inclusive time and invalidations on this instance,
+        returns the GraphProfiler (report(), costs() for show). Accessors are rebuilt with the profiling
+        wrapper, references to accessors taken before (e.g. `a = g.A`) stay unprofiled.
+        """
+        if self._profiler is None:
+            self._profiler = GraphProfiler()
+            self._dropAccessors()
+        return self._profiler
+
+    def disableProfiling(self):
+        """Stops profiling, the accessors go back to the unprofiled ones. Returns the GraphProfiler."""
+        profiler, self._profiler = self._profiler, None
+        if profiler is not None:
+            self._dropAccessors()
+        return profiler
+
+    def _dropAccessors(self):
+        for name in self._accessorNames():
+            del self.__dict__[name]
+
+    def cacheInfo(self, node):
+        """Cache statistics of a node, hit/miss counts are only tracked for nodes that take arguments."""
+        graphNode = getattr(type(self), node)
+        hits, misses = self._cacheStats.get(node, (0, 0))
+        cached = self._cache.get(node)
+        if graphNode.parameterized:
+            return NodeCacheInfo(hits, misses, graphNode.maxsize, len(cached or ()))
+        return NodeCacheInfo(hits, misses, 1, int(node in self._cache))
+
+    @property
+    def revision(self):
+        """Bumped by every invalidation, see changedSince."""
+        return self._revision
+
+    def changedSince(self, revision, nodes=None):
+        """Nodes (all of them, or those in `nodes`) whose cached value changed after `revision`."""
+        changedAt = self._changedAt
+        return [node for node in (changedAt if nodes is None else nodes) if changedAt.get(node, -1) > revision]
+
     def invalidate(self, node):
-        """Invalidate node and all downstream dependents."""
+        """
+        Invalidate node and all downstream dependents. Nothing is recomputed here: node is recomputed
+        on its next read, its dependents are marked stale and only recomputed on their next read if one
+        of their dependencies actually changed value.
+        """
+        self._revision += 1
+        self._markStale(node)
+        if node in self._stale:
+            self._mustRecompute.add(node)
+        for dep in self._affectedBy(node):
+            self._markStale(dep)
+
+    def _affectedBy(self, node):
+        if not self.dynamicDependencies:
+            # already transitively closed
+            return self._dependents.get(node, ())
+
+        # the dynamic edges are not transitively closed, walk them breadth first
+        seen = {node}
+        toVisit = deque([node])
+        while toVisit:
+            for dep in self._dynDependents.get(toVisit.popleft(), ()):
+                if dep not in seen:
+                    seen.add(dep)
+                    toVisit.append(dep)
+        seen.discard(node)
+        return seen
+
+    def _markStale(self, node):
+        # a node already stale keeps the value it had before the first invalidation
         if node in self._cache:
-            del self._cache[node]
-        for dep in self._dependents.get(node, []):
-            self.invalidate(dep)
+            self._stale[node] = self._cache.pop(node)
+            if self._profiler is not None:
+                self._profiler.invalidated(node)
+        elif self._snapshot is not None:
+            # a snapshot value computed from the old inputs must not be loaded any more
+            self._snapshot.discard(node)
+
+    @contextmanager
+    def batch(self, recompute=()):
+        """
+        Transaction for settable nodes: set() calls inside the block are held back and applied together
+        when the outermost batch exits, with one invalidation over the union of their dependents.
+        Reads inside the block still see the old values, and nothing is applied if the block raises.
+        The nodes in `recompute` are then recomputed eagerly.
+        """
+        # a nested block that raises only discards its own sets, even if an outer block catches the error
+        pendingOnEntry = dict(self._pendingSets)
+        self._batchDepth += 1
+        try:
+            yield self
+        except BaseException:
+            self._pendingSets = pendingOnEntry
+            raise
+        finally:
+            self._batchDepth -= 1
+
+        if self._batchDepth == 0:
+            pending, self._pendingSets = self._pendingSets, {}
+            self._setInputs(pending)
+            for node in recompute:
+                getattr(self, node)()
+
+    def _setInput(self, node, value):
+        if self._batchDepth:
+            self._pendingSets[node] = value
+        else:
+            self._setInputs({node: value})
+
+    def _setInputs(self, values):
+        if not values:
+            return
+        self._revision += 1
+        affected = set()
+        for node in values:
+            affected.update(self._affectedBy(node))
+        affected.difference_update(values)
+        for dep in affected:
+            self._markStale(dep)
+
+        for node, value in values.items():
+            old = self._cache.pop(node, _missing)
+            if old is _missing:
+                old = self._stale.pop(node, _missing)
+            self._mustRecompute.discard(node)
+            self._store(node, value, old)
+
+    def _store(self, node, value, old=_missing):
+        self._cache[node] = value
+        if old is _missing or not _sameValue(old, value):
+            self._changedAt[node] = self._revision
+        self._verifiedAt[node] = self._revision
+
+    def _loadFromSnapshot(self, node):
+        if self._snapshot is None or node not in self._snapshot:
+            return False
+        logger.debug('[Graph] %s loaded from snapshot', node)
+        # snapshot values are consistent with the restored inputs: verified now, but not counted as a change
+        self._cache[node] = self._snapshot.pop(node)
+        self._verifiedAt[node] = self._revision
+        return True
+
+    def saveSnapshot(self, path):
+        """Writes the cache and settable inputs to `path`, see snapshot.saveSnapshot."""
+        saveSnapshot(self, path)
+
+    def loadSnapshot(self, path):
+        """Warm starts the graph from a file written by saveSnapshot, see snapshot.loadSnapshot."""
+        return loadSnapshot(self, path)
+
+    def _refresh(self, node):
+        if self._profiler is not None:
+            # the dependencies refreshed here count towards the inclusive time of node
+            with self._profiler.refreshing(node):
+                return self._refreshStale(node)
+        return self._refreshStale(node)
+
+    def _refreshStale(self, node):
+        """
+        Brings a stale node back: restores its old value if none of its dependencies changed
+        value since it was last verified, recomputes it otherwise. Stale dependencies are refreshed
+        first, with an explicit stack so long chains of stale nodes do not hit the recursion limit.
+        """
+        stack = [node]
+        while stack:
+            current = stack[-1]
+            if current not in self._stale:
+                stack.pop()
+                continue
+
+            deps = self._readDependencies(current)
+            verifiedAt = self._verifiedAt.get(current, -1)
+            # a dependency neither cached nor stale was not read by the node's last evaluation
+            changed = current in self._mustRecompute or any(
+                self._changedAt.get(dep, -1) > verifiedAt for dep in deps if dep not in self._stale)
+            if not changed:
+                staleDeps = [dep for dep in deps if dep in self._stale]
+                if staleDeps:
+                    stack.extend(staleDeps)
+                    continue
+                changed = any(self._changedAt.get(dep, -1) > verifiedAt for dep in deps)
+
+            stack.pop()
+            if changed:
+                self._recompute(current)
+            else:
+                logger.debug('[Graph] %s unchanged, restored from stale', current)
+                self._cache[current] = self._stale.pop(current)
+                self._verifiedAt[current] = self._revision
+
+    def _readDependencies(self, node):
+        if self.dynamicDependencies:
+            return self._dynDependencies.get(node, ())
+        return self._directDependencies.get(node, ())
+
+    def _recompute(self, node):
+        self._mustRecompute.discard(node)
+        old = self._stale.pop(node)
+        self._clearDynamicDependencies(node)
+        graphNode = getattr(type(self), node)
+        if graphNode.parameterized:
+            # variants are recomputed on demand and cannot be compared to the old ones, count it as changed
+            self._store(node, OrderedDict())
+            return
+        self._store(node, graphNode._evaluate(self, (), {}), old)
+
+    async def evaluate(self, targets, executor=None):
+        """
+        Computes `targets` (nodes without arguments) and the nodes they depend on, one topological
+        level at a time, running the nodes of a level concurrently: async nodes on the event loop,
+        offload=True nodes on `executor` (thread or process pool), other nodes inline.
+        Results go to the same cache as plain reads. Returns {target: value}.
+        """
+        cls = type(self)
+        needed = set(targets)
+        for target in targets:
+            if getattr(cls, target).parameterized:
+                raise ValueError(f'graph_node {target} takes arguments and cannot be a target')
+            needed.update(self._dependencies.get(target, ()))
+        subgraph = {node: self._directDependencies.get(node, set()) & needed for node in needed}
+        loop = asyncio.get_running_loop()
+
+        # kahnToposortLevels starts from the nodes nothing depends on, reversed the dependencies come first
+        for level in kahnToposortLevels(subgraph)[::-1]:
+            names, pending = [], []
+            for node in level:
+                graphNode = getattr(cls, node)
+                # parameterized nodes are computed on demand, by the nodes reading them
+                if graphNode.parameterized or node in self._cache or self._loadFromSnapshot(node):
+                    continue
+                if node in self._stale and self._restoreIfUnchanged(node):
+                    continue
+
+                if graphNode.isAsync:
+                    work = graphNode.func(self)
+                elif graphNode.offload and executor is not None:
+                    if isinstance(executor, ProcessPoolExecutor):
+                        work = loop.run_in_executor(executor, _evaluateRemote, self, node)
+                    else:
+                        work = loop.run_in_executor(executor, graphNode.func, self)
+                else:
+                    work = loop.create_future()
+                    work.set_result(graphNode.func(self))
+                names.append(node)
+                pending.append(work)
+
+            for node, value in zip(names, await asyncio.gather(*pending)):
+                self._mustRecompute.discard(node)
+                self._clearDynamicDependencies(node)
+                if self.dynamicDependencies:
+                    # concurrent evaluations cannot be traced, fall back to the static edges
+                    self._addDynamicDependencies(node, set(self._directDependencies.get(node, ())))
+                self._store(node, value, self._stale.pop(node, _missing))
+
+        return {target: self._cache[target] for target in targets}
+
+    def _restoreIfUnchanged(self, node):
+        if node in self._mustRecompute:
+            return False
+        deps = self._readDependencies(node)
+        for dep in deps:
+            if dep in self._stale:
+                self._refresh(dep)
+        verifiedAt = self._verifiedAt.get(node, -1)
+        if any(self._changedAt.get(dep, -1) > verifiedAt for dep in deps):
+            return False
+        self._cache[node] = self._stale.pop(node)
+        self._verifiedAt[node] = self._revision
+        return True
+
+    def _addDynamicDependencies(self, node, reads):
+        reads.discard(node)
+        self._dynDependencies.setdefault(node, set()).update(reads)
+        for dep in reads:
+            self._dynDependents.setdefault(dep, set()).add(node)
+
+    def _clearDynamicDependencies(self, node):
+        for dep in self._dynDependencies.pop(node, ()):
+            self._dynDependents[dep].discard(node)
+
+    def getDynamicDependencyGraph(self):
+        """node -> nodes it read on its last evaluation (direct edges), dynamic mode only."""
+        return {node: set(deps) for node, deps in self._dynDependencies.items()}
 
     @staticmethod
     def _expandDependencyGraph(graph):
@@ -70,21 +514,36 @@ class Graph:
         # in this case v for D will have {A, constant} and, since we only want to track graph_nodes and the
         # ast walk only puts graph_nodes in the graph's key, performing v.interset(graph.keys) does the trick.
         # TODO find a way to handle it while doing the ast walk
-        graph = {k: set(v).intersection(graph) for k, v in graph.items()}        
-        nodesToExpand = deque(graph.keys())
+        graph = {k: set(v).intersection(graph) for k, v in graph.items()}
+        expanded = {}
 
-        while nodesToExpand:
-            node = nodesToExpand.popleft()
-            current_deps = graph[node].copy()
+        # iterative post-order walk: each node's closure is built once from its dependencies' closures
+        for root in graph:
+            if root in expanded:
+                continue
+            inProgress = {root}
+            stack = [(root, iter(graph[root]))]
+            while stack:
+                node, deps = stack[-1]
+                for dep in deps:
+                    if dep not in expanded and dep not in inProgress:
+                        inProgress.add(dep)
+                        stack.append((dep, iter(graph[dep])))
+                        break
+                else:
+                    stack.pop()
+                    inProgress.discard(node)
+                    closure = set(graph[node])
+                    for dep in graph[node]:
+                        closure.update(expanded.get(dep, ()))
+                    expanded[node] = closure
 
-            for dep in current_deps:
-                new_items = graph[dep].difference(current_deps)
-                if not new_items:
-                    continue
-                graph[node].update(new_items)
-                nodesToExpand.append(node)
-        
-        return graph
+        return expanded
+
+    @staticmethod
+    def _isGraphNodeDecorator(decorator):
+        return (isinstance(decorator, ast.Call) and isinstance(decorator.func, ast.Name)
+                and decorator.func.id == graph_node.__name__)
 
     @staticmethod
     def _getDependencyGraphFromTree(tree):
@@ -92,21 +551,60 @@ class Graph:
         for node in ast.walk(tree):
             if not hasattr(node, 'decorator_list'):
                 continue
-            if not any(d.func.id == graph_node.__name__ for d in node.decorator_list):
+            if not any(Graph._isGraphNodeDecorator(d) for d in node.decorator_list):
                 continue
             dependency_graph[node.name] = set()
             for inner_node in node.body:
                 for _n in ast.walk(inner_node):
-                    if isinstance(_n, ast.Attribute) and _n.value.id=='self':
+                    if isinstance(_n, ast.Attribute) and isinstance(_n.value, ast.Name) and _n.value.id=='self':
                         dependency_graph[node.name].add(_n.attr)
         return dependency_graph
 
+    @classmethod
+    def _getOwnDependencyGraph(cls):
+        """Direct dependencies of the graph nodes defined on cls itself (not inherited ones)."""
+        nodes = {name: attr for name, attr in vars(cls).items() if isinstance(attr, GraphNode)}
+        declared = {name: node.dependsOn for name, node in nodes.items() if node.dependsOn is not None}
+        if len(declared) == len(nodes):
+            return declared
+        try:
+            tree = ast.parse(textwrap.dedent(inspect.getsource(cls)))
+            graph = cls._getDependencyGraphFromTree(tree)
+        except (OSError, TypeError, SyntaxError):
+            logger.debug(f'[Graph] source of {cls.__name__} not available')
+            graph = {}
+        # without source (or for nodes created dynamically) fall back to every name the node's code
+        # references, an over-approximation that _expandDependencyGraph trims to graph nodes
+        for name, node in nodes.items():
+            if name not in graph:
+                graph[name] = set(node.func.__code__.co_names)
+        graph.update(declared)
+        return {name: graph[name] for name in nodes}
+
+    @classmethod
+    def getDirectDependencyGraph(cls):
+        graph = {}
+        # base classes first, so a node overridden in a subclass replaces the inherited one
+        for klass in reversed(cls.__mro__):
+            if issubclass(klass, Graph):
+                graph.update(klass._getOwnDependencyGraph())
+        return {k: set(v).intersection(graph) for k, v in graph.items()}
+
     @classmethod
     def getDependencyGraph(cls):
-        src = inspect.getsource(cls)
-        tree = ast.parse(src)
-        graph = cls._getDependencyGraphFromTree(tree)
-        return cls._expandDependencyGraph(graph)
+        return cls._expandDependencyGraph(cls.getDirectDependencyGraph())
+
+    @classmethod
+    def getDependencyMaps(cls):
+        """(direct dependencies, dependencies, dependents) of the class, computed on first use and cached on the class."""
+        # looked up in the class' own __dict__ so a subclass never picks up its parent's maps
+        maps = cls.__dict__.get('_dependencyMaps')
+        if maps is None:
+            direct = cls.getDirectDependencyGraph()                                      # node -> set of direct dependencies
+            dependencies = cls._expandDependencyGraph(direct)                            # node -> set of dependencies
+            maps = (direct, dependencies, cls.getReverseDependencyGraph(dependencies))   # node -> set of dependents
+            cls._dependencyMaps = maps
+        return maps
     
     @staticmethod
     def getReverseDependencyGraph(graph):
@@ -118,8 +616,9 @@ class Graph:
                 reverseDependency[dependancy].add(fn_name)
         return reverseDependency
     
-    def show(self):
+    def show(self, costs=None):
+        """Renders the dependency graph, `costs` ({node: cost}, e.g. profiler.costs()) colors and sizes the nodes."""
         from visualize import visualizeGraphWithLevels
         with SuppressLogging(DEBUG):
-            visualizeGraphWithLevels(self._dependencies)
+            visualizeGraphWithLevels(self._dependencies, costs)
 
@@ -0,0 +1,123 @@
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+class NodeProfile:
+    __slots__ = ('calls', 'hits', 'evaluations', 'selfTime', 'inclusiveTime', 'invalidations', 'claimed')
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.calls = 0              # reads through the node accessor
+        self.hits = 0               # reads that found the node computed and no evaluation since the last read
+        self.evaluations = 0        # times the node function ran, from a read or a refresh
+        self.selfTime = 0.0         # seconds in the node function, minus the nodes it evaluated
+        self.inclusiveTime = 0.0    # seconds to produce the node's value: refreshing its stale dependencies,
+                                    # the node function and everything it evaluated
+        self.invalidations = 0      # times a cached value was marked stale
+        self.claimed = 0            # evaluations already accounted as a miss by a read
+
+    @property
+    def hitRatio(self):
+        return self.hits / self.calls if self.calls else 0.0
+
+    def snapshot(self):
+        return {
+            "calls": self.calls,
+            "hits": self.hits,
+            "hitRatio": self.hitRatio,
+            "evaluations": self.evaluations,
+            "selfTime": self.selfTime,
+            "inclusiveTime": self.inclusiveTime,
+            "invalidations": self.invalidations,
+        }
+
+
+class GraphProfiler:
+    """
+    Per node statistics of one Graph instance, see Graph.enableProfiling.
+    Nodes computed by Graph.evaluate on the event loop or an executor are not timed.
+    """
+    def __init__(self):
+        self.nodes = defaultdict(NodeProfile)
+        self._stack = []            # one [node, refresh?, seconds spent in nested frames] per evaluation or refresh in progress
+
+    def wrap(self, node, caller):
+        """Counts calls and hits of a node accessor."""
+        stats = self.nodes[node]
+
+        def profiled(*args, **kwargs):
+            stats.calls += 1
+            result = caller(*args, **kwargs)
+            # an evaluation since the last read, e.g. by the refresh of a dependent, makes this read a miss
+            if stats.evaluations == stats.claimed:
+                stats.hits += 1
+            else:
+                stats.claimed = stats.evaluations
+            return result
+        return profiled
+
+    @contextmanager
+    def timing(self, node):
+        """Frame of an evaluation of the node function."""
+        stats = self.nodes[node]
+        stats.evaluations += 1
+        parent = self._stack[-1] if self._stack else None
+        frame = [node, False, 0.0]
+        self._stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._stack.pop()
+            stats.selfTime += elapsed - frame[2]
+            # within a refresh of the same node, the refresh frame already counts it as inclusive time
+            if parent is None or parent[0] != node or not parent[1]:
+                stats.inclusiveTime += elapsed
+            if parent is not None:
+                parent[2] += elapsed
+
+    @contextmanager
+    def refreshing(self, node):
+        """Frame of a refresh of a stale node: its stale dependencies are brought back before the node itself."""
+        stats = self.nodes[node]
+        frame = [node, True, 0.0]
+        self._stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._stack.pop()
+            stats.inclusiveTime += elapsed
+            if self._stack:
+                self._stack[-1][2] += elapsed
+
+    def invalidated(self, node):
+        self.nodes[node].invalidations += 1
+
+    def reset(self):
+        # zeroed in place: the accessors built by wrap() hold on to these NodeProfile objects
+        for stats in self.nodes.values():
+            stats.reset()
+
+    def costs(self, metric='selfTime'):
+        """node -> value of `metric`, e.g. to color Graph.show by cost."""
+        return {node: getattr(stats, metric) for node, stats in self.nodes.items()}
+
+    def snapshot(self):
+        return {node: stats.snapshot() for node, stats in self.nodes.items()}
+
+    def report(self, sortBy='selfTime', limit=None):
+        """Table of the profiled nodes, most expensive first."""
+        rows = sorted(self.nodes.items(), key=lambda item: getattr(item[1], sortBy), reverse=True)[:limit]
+        width = max([len('node'), *(len(node) for node, _ in rows)])
+        lines = [f'{"node":<{width}} {"calls":>8} {"hit %":>6} {"evals":>8} '
+                 f'{"self ms":>10} {"incl ms":>10} {"invalid":>8}']
+        for node, stats in rows:
+            lines.append(f'{node:<{width}} {stats.calls:>8} {stats.hitRatio * 100:>6.1f} {stats.evaluations:>8} '
+                         f'{stats.selfTime * 1e3:>10.3f} {stats.inclusiveTime * 1e3:>10.3f} {stats.invalidations:>8}')
+        return '\n'.join(lines)
@@ -0,0 +1,173 @@
+import hashlib
+import mmap
+import os
+import pickle
+import struct
+from lib.logging import logger
+
+MAGIC = b'GRAPHSN1'
+_TRAILER = struct.Struct('<Q8s')     # index offset, magic
+_ALIGN = 64                          # out-of-band buffers are aligned so arrays can be used in place
+
+
+class SnapshotMismatchError(ValueError):
+    """The snapshot was written by a graph class with a different dependency structure."""
+
+
+def _hashCode(h, code):
+    # bytecode alone misses edited constants (`* 10` -> `* 1000`) and renamed globals or attributes.
+    # Line numbers and file names are left out so moving a node around does not invalidate snapshots
+    h.update(code.co_code)
+    h.update(repr(code.co_names).encode())
+    for const in code.co_consts:
+        _hashConst(h, const)
+
+
+def _hashConst(h, const):
+    if isinstance(const, type(_hashCode.__code__)):
+        _hashCode(h, const)
+    elif isinstance(const, tuple):
+        h.update(b'(')
+        for item in const:
+            _hashConst(h, item)
+        h.update(b')')
+    elif isinstance(const, frozenset):
+        # iteration order of a frozenset of strings changes with the hash seed
+        h.update(repr(sorted(repr(item) for item in const)).encode())
+    else:
+        h.update(repr(const).encode())
+
+
+def fingerprint(cls):
+    """
+    Hash of a graph class' nodes, their flags and direct dependencies. The nodes' code (bytecode, constants
+    and names, nested functions included) is part of it, a snapshot taken before a change to how a node is
+    computed would hold values it no longer produces.
+    """
+    direct = cls.getDependencyMaps()[0]
+    h = hashlib.sha256(f'{cls.__module__}.{cls.__qualname__}'.encode())
+    for name in sorted(direct):
+        node = getattr(cls, name)
+        h.update(repr((name, node.settable, node.parameterized, sorted(direct[name]))).encode())
+        _hashCode(h, node.func.__code__)
+    return h.hexdigest()
+
+
+def _writePickled(f, data, buffers):
+    offset = f.tell()
+    f.write(data)
+    bufferEntries = []
+    for raw in buffers:
+        f.write(b'\0' * (-f.tell() % _ALIGN))
+        bufferEntries.append((f.tell(), raw.nbytes))
+        f.write(raw)
+    return offset, len(data), bufferEntries
+
+
+def _writeValue(f, value):
+    buffers = []
+    data = pickle.dumps(value, protocol=5, buffer_callback=buffers.append)
+    return _writePickled(f, data, [buffer.raw() for buffer in buffers])
+
+
+def saveSnapshot(graph, path):
+    """
+    Writes the fresh cache of `graph` (stale values are skipped), its settable inputs and the
+    fingerprint of its class to `path`. Large buffers (e.g. NumPy arrays) are stored out of band.
+    Values of the snapshot the graph was warm started from that were not read yet are carried over
+    as they are, without unpickling them.
+    """
+    cls = type(graph)
+    index = {'fingerprint': fingerprint(cls), 'inputs': {}, 'nodes': {},
+             'dynamicDependencies': graph.getDynamicDependencyGraph()}
+
+    # written next to `path` and moved over it: `path` may be the file the graph's snapshot maps
+    tmpPath = f'{path}.tmp'
+    with open(tmpPath, 'wb') as f:
+        f.write(MAGIC)
+        for name, value in graph._cache.items():
+            kind = 'inputs' if getattr(cls, name).settable else 'nodes'
+            index[kind][name] = _writeValue(f, value)
+        if graph._snapshot is not None:
+            for name, entry in graph._snapshot.nodes.items():
+                if name not in index['nodes']:
+                    index['nodes'][name] = _writePickled(f, *graph._snapshot.raw(entry))
+
+        indexOffset = f.tell()
+        pickle.dump(index, f, protocol=5)
+        f.write(_TRAILER.pack(indexOffset, MAGIC))
+    os.replace(tmpPath, path)
+
+    logger.debug('[snapshot] saved %d inputs and %d nodes to %s', len(index['inputs']), len(index['nodes']), path)
+
+
+class GraphSnapshot:
+    """Memory mapped snapshot file, node values are unpickled on first access."""
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        indexOffset, magic = _TRAILER.unpack(self._mm[-_TRAILER.size:])
+        if self._mm[:len(MAGIC)] != MAGIC or magic != MAGIC:
+            self.close()
+            raise ValueError(f'{path} is not a graph snapshot')
+        index = pickle.loads(self._mm[indexOffset:-_TRAILER.size])
+        self.fingerprint = index['fingerprint']
+        self.inputs = index['inputs']
+        self.nodes = index['nodes']
+        self.dynamicDependencies = index['dynamicDependencies']
+
+    def load(self, entry):
+        # buffers are views on the mapping: arrays come back read-only and are only paged in when used
+        data, buffers = self.raw(entry)
+        return pickle.loads(data, buffers=buffers)
+
+    def raw(self, entry):
+        """Pickle data and out-of-band buffers of an entry, as views on the mapping."""
+        offset, length, bufferEntries = entry
+        view = memoryview(self._mm)
+        return view[offset:offset + length], [view[start:start + size] for start, size in bufferEntries]
+
+    def __contains__(self, node):
+        return node in self.nodes
+
+    def pop(self, node):
+        """Value of a node, removed from the snapshot so it is loaded at most once."""
+        return self.load(self.nodes.pop(node))
+
+    def discard(self, node):
+        self.nodes.pop(node, None)
+
+    def close(self):
+        # values loaded out of band may still reference the mapping, leave it to the garbage collector then
+        try:
+            self._mm.close()
+        except BufferError:
+            pass
+        self._file.close()
+
+
+def loadSnapshot(graph, path):
+    """
+    Warm starts `graph` from a snapshot: settable inputs are restored right away, other nodes are
+    loaded lazily on their first read. Raises SnapshotMismatchError if the snapshot was written by
+    a graph class with a different dependency structure.
+    """
+    snapshot = GraphSnapshot(path)
+    expected = fingerprint(type(graph))
+    if snapshot.fingerprint != expected:
+        snapshot.close()
+        raise SnapshotMismatchError(f'{path} does not match {type(graph).__qualname__}')
+
+    graph._setInputs({name: snapshot.load(entry) for name, entry in snapshot.inputs.items()})
+    for node in list(snapshot.nodes):
+        # nodes the graph already holds a value for keep it
+        if node in graph._cache or node in graph._stale:
+            snapshot.discard(node)
+    for node, deps in snapshot.dynamicDependencies.items():
+        graph._addDynamicDependencies(node, set(deps))
+
+    if graph._snapshot is not None:
+        graph._snapshot.close()
+    graph._snapshot = snapshot
+    logger.debug('[snapshot] loaded %s, %d nodes available lazily', path, len(snapshot.nodes))
+    return snapshot
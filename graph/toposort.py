@@ -0,0 +1,32 @@
+from collections import deque
+
+def kahnToposortLevels(graph):
+    inDegree = {node: 0 for node in graph}
+    for deps in graph.values():
+        for dep in deps:
+            inDegree[dep] += 1
+
+    queue = deque([node for node, deg in inDegree.items() if deg == 0])
+    levels = []
+    processedCount = 0
+    
+    while queue:
+        levelSize = len(queue)
+        currentLevel = []
+
+        for _ in range(levelSize):
+            node = queue.popleft()
+            currentLevel.append(node)
+            processedCount += 1
+
+            for neighbor in graph[node]:
+                inDegree[neighbor] -= 1
+                if inDegree[neighbor] == 0:
+                    queue.append(neighbor)
+
+        levels.append(currentLevel)
+
+    if processedCount != len(graph):
+        raise ValueError("Graph has a cycle!")
+
+    return levels
@@ -1,52 +1,29 @@
 from graphviz import Digraph
-from collections import deque
+from toposort import kahnToposortLevels
 
-def kahnToposortLevels(graph):
-    inDegree = {node: 0 for node in graph}
-    for deps in graph.values():
-        for dep in deps:
-            inDegree[dep] += 1
-
-    queue = deque([node for node, deg in inDegree.items() if deg == 0])
-    levels = []
-    processedCount = 0
-    
-    while queue:
-        levelSize = len(queue)
-        currentLevel = []
-
-        for _ in range(levelSize):
-            node = queue.popleft()
-            currentLevel.append(node)
-            processedCount += 1
-
-            for neighbor in graph[node]:
-                inDegree[neighbor] -= 1
-                if inDegree[neighbor] == 0:
-                    queue.append(neighbor)
-
-        levels.append(currentLevel)
-
-    if processedCount != len(graph):
-        raise ValueError("Graph has a cycle!")
-
-    return levels
-
-
-def visualizeGraphWithLevels(graph):
+def visualizeGraphWithLevels(graph, costs=None):
+    """costs: optional {node: cost}, nodes are then colored white to red and sized by cost instead of by level"""
     levels = kahnToposortLevels(graph)[::-1]
 
     dot = Digraph(format="png")
     dot.attr(rankdir="LR")  # left-to-right layout (use TB for top-to-bottom)
 
     colors = ['lightblue', 'lightgreen', 'pink', 'yellow', 'green', 'red']
+    maxCost = max(costs.values(), default=0.0) if costs else 0.0
 
     # Create nodes in their levels
     for levelIdx, nodes in enumerate(levels):
         with dot.subgraph() as s:
             s.attr(rank='same')
             for node in nodes:
-                s.node(node, shape="circle", style="filled", fillcolor=colors[levelIdx % len(colors)])
+                if costs is None:
+                    s.node(node, shape="circle", style="filled", fillcolor=colors[levelIdx % len(colors)])
+                    continue
+                cost = costs.get(node, 0.0)
+                share = cost / maxCost if maxCost else 0.0
+                fade = int(255 * (1 - share))
+                s.node(node, label=f'{node}\n{cost:.3g}', shape="circle", style="filled",
+                       fillcolor=f'#ff{fade:02x}{fade:02x}', width=str(0.75 + 1.25 * share))
 
     # Add edges
     for node, deps in graph.items():
@@ -0,0 +1,95 @@
+from collections import defaultdict
+from graph.graph import Graph, GraphNode
+
+def _market_data_node(key):
+    def node(self):
+        # no value before the first tick, like Env.get
+        return None
+    node.__name__ = f'marketData[{key}]'
+    return GraphNode(node, settable=True, dependsOn=())
+
+def _curves_node(keys):
+    inputs = [f'marketData[{key}]' for key in keys]
+
+    def node(self):
+        return {key: getattr(self, name)() for key, name in zip(keys, inputs)}
+    node.__name__ = f'curves[{",".join(keys)}]'
+    return GraphNode(node, dependsOn=inputs)
+
+def _price_node(name, model, instruments, curves):
+    async def node(self):
+        return await model.compute(instruments, getattr(self, curves)())
+    node.__name__ = name
+    return GraphNode(node, dependsOn=[curves])
+
+class GraphModel:
+    """
+    Incremental pricing on graph.Graph instead of the changed_keys dispatch of MultiModel.
+
+    Every market data key is a settable node. The market data a group of instruments is priced
+    against (its curves) is a node shared by every model pricing off the same keys, and each
+    (model, keys) group of instruments is one async price node calling model.compute. A tick
+    sets the keys in one Graph.batch and evaluates the price nodes: curves are built once per
+    tick, groups whose keys kept their value are restored without being repriced, and only
+    the groups whose prices changed are returned.
+    """
+    def __init__(self, models, instruments=()):
+        self.models = models
+        self._market_data = {}          # last value set for each key, carried over when the graph is rebuilt
+        self.set_instruments(instruments)
+
+    def set_instruments(self, instruments):
+        """Rebuilds the graph for a new book, the next tick then prices every instrument."""
+        self.instruments = list(instruments)
+        groups = defaultdict(list)      # (model index, keys) -> instruments
+        for inst in self.instruments:
+            inst_deps = set(inst.depends_on())
+            for i, model in enumerate(self.models):
+                keys = tuple(sorted(inst_deps.intersection(model.required_market_data())))
+                if keys:
+                    groups[i, keys].append(inst)
+
+        attrs = {}
+        self._price_nodes = []
+        for (i, keys), insts in groups.items():
+            for key in keys:
+                attrs.setdefault(f'marketData[{key}]', _market_data_node(key))
+            curves = f'curves[{",".join(keys)}]'
+            if curves not in attrs:
+                attrs[curves] = _curves_node(keys)
+            name = f'price[{i}:{type(self.models[i]).__name__}|{",".join(keys)}]'
+            attrs[name] = _price_node(name, self.models[i], insts, curves)
+            self._price_nodes.append(name)
+
+        self.graph = type('PricingGraph', (Graph,), attrs)()
+        self._revision = -1             # graph revision priced by the last tick, -1 so a new graph returns everything
+        self._set(self._market_data)
+
+    def _set(self, market_data):
+        graph = self.graph
+        with graph.batch():
+            for key, value in market_data.items():
+                node = getattr(graph, f'marketData[{key}]', None)
+                if node is not None:
+                    node.set(value)
+
+    async def compute(self, market_data, changed_keys=None):
+        """
+        Prices a tick and returns {inst_id: result} for the instruments whose result changed.
+        Only the keys in `changed_keys` are set when it is given, all of `market_data` otherwise:
+        keys set to the value they already had do not cause any repricing.
+        """
+        if changed_keys is not None:
+            market_data = {key: market_data[key] for key in changed_keys if key in market_data}
+        self._market_data.update(market_data)
+
+        self._set(market_data)
+        values = await self.graph.evaluate(self._price_nodes)
+        changed = self.graph.changedSince(self._revision, self._price_nodes)
+        self._revision = self.graph.revision
+
+        final_result = {}
+        for name in changed:
+            for inst_id, result in values[name].items():
+                final_result.setdefault(inst_id, {}).update(result)
+        return final_result
@@ -1,24 +1,25 @@
 from env import Env
 
+# instrument type -> (market data key, reference value, price at reference, price otherwise)
+PRICING_PARAMS = {
+    "bond": ("DiscountCurve", "USD_1", 100.0, 95.0),
+    "futures": ("ForwardCurve", "FW_1", 200.0, 190.0),
+}
+
 class Instrument:
     def __init__(self, id: str, instrument_type: str):
         self.id = id
         self.type = instrument_type
 
     def depends_on(self):
-        if self.type == "bond":
-            return ["DiscountCurve"]
-        elif self.type == "futures":
-            return ["ForwardCurve"]
+        if self.type in PRICING_PARAMS:
+            return [PRICING_PARAMS[self.type][0]]
         else:
             return []
 
     def Price(self):
-        if self.type == "bond":
-            dsc = Env.get("DiscountCurve")
-            return 100.0 if dsc == "USD_1" else 95.0
-        elif self.type == "futures":
-            fwd = Env.get("ForwardCurve")
-            return 200.0 if fwd == "FW_1" else 190.0
+        if self.type in PRICING_PARAMS:
+            key, ref_value, ref_price, alt_price = PRICING_PARAMS[self.type]
+            return ref_price if Env.get(key) == ref_value else alt_price
         else:
-            return 0.0
\ No newline at end of file
+            return 0.0
@@ -0,0 +1,85 @@
+import numpy as np
+from instrument import Instrument, PRICING_PARAMS
+
+class InstrumentBook:
+    """
+    Columnar store of instruments: one NumPy array per field instead of one
+    Instrument object per row, so a whole slice can be priced in one call.
+    """
+    TYPES = list(PRICING_PARAMS)
+    UNKNOWN_TYPE = -1
+
+    def __init__(self, ids, types, ref_values, ref_prices, alt_prices):
+        self.ids = ids                  # object array of instrument ids
+        self.types = types              # int array of codes into TYPES, UNKNOWN_TYPE otherwise
+        self.ref_values = ref_values    # object array of the market data value each row is priced against
+        self.ref_prices = ref_prices    # float array, price when the market data matches ref_values
+        self.alt_prices = alt_prices    # float array, price otherwise
+
+    @classmethod
+    def from_instruments(cls, instruments):
+        instruments = list(instruments)
+        ids = np.array([inst.id for inst in instruments], dtype=object)
+        types = np.array(
+            [cls.TYPES.index(inst.type) if inst.type in PRICING_PARAMS else cls.UNKNOWN_TYPE
+             for inst in instruments],
+            dtype=np.int16,
+        )
+        return cls.from_columns(ids, types)
+
+    @classmethod
+    def from_columns(cls, ids, types):
+        """Builds a book from an id array and an array of type codes, filling the pricing columns."""
+        types = np.asarray(types, dtype=np.int16)
+        # the last slot of each per-type table is used by UNKNOWN_TYPE rows
+        ref_values = np.array([params[1] for params in PRICING_PARAMS.values()] + [None], dtype=object)
+        ref_prices = np.array([params[2] for params in PRICING_PARAMS.values()] + [0.0])
+        alt_prices = np.array([params[3] for params in PRICING_PARAMS.values()] + [0.0])
+        return cls(
+            np.asarray(ids, dtype=object),
+            types,
+            ref_values[types],
+            ref_prices[types],
+            alt_prices[types],
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def take(self, rows):
+        """Returns the sub-book for `rows` (a boolean mask or an array of row indices)."""
+        return InstrumentBook(
+            self.ids[rows],
+            self.types[rows],
+            self.ref_values[rows],
+            self.ref_prices[rows],
+            self.alt_prices[rows],
+        )
+
+    @classmethod
+    def type_codes(cls, keys):
+        """Codes of the instrument types priced off any of the market data `keys`."""
+        return [code for code, params in enumerate(PRICING_PARAMS.values()) if params[0] in keys]
+
+    def depending_on(self, keys):
+        """Returns the sub-book of instruments that depend on any of the market data `keys`."""
+        return self.take(np.isin(self.types, self.type_codes(keys)))
+
+    def price(self, market_data):
+        """
+        Vectorized Instrument.Price for every row, with `market_data` playing the role of the Env:
+        rows whose key is missing from `market_data` get their alternative price, like Env.get
+        returning None.
+        """
+        prices = self.alt_prices.copy()
+        for key, value in market_data.items():
+            matched = np.isin(self.types, self.type_codes([key])) & (self.ref_values == value)
+            prices[matched] = self.ref_prices[matched]
+        return prices
+
+    def instruments(self):
+        """Materializes the rows back into Instrument objects."""
+        return [
+            Instrument(inst_id, self.TYPES[code] if code != self.UNKNOWN_TYPE else None)
+            for inst_id, code in zip(self.ids, self.types)
+        ]
@@ -2,6 +2,7 @@ import asyncio
 from instrument import Instrument
 from risk_model import DiscountCurveModel, ForwardCurveModel
 from multi_model import MultiModel
+from result_cache import ResultCache
 
 async def simulate_market_ticks():
     instruments = [
@@ -12,9 +13,9 @@ async def simulate_market_ticks():
     ]
 
     multi_model = MultiModel([
-        DiscountCurveModel(),
-        ForwardCurveModel()
-    ])
+        DiscountCurveModel(cache=ResultCache()),
+        ForwardCurveModel(cache=ResultCache())
+    ], instruments)
 
     tick_data = [
         {"DiscountCurve": "USD_1", "ForwardCurve": "FW_1"},
@@ -30,7 +31,7 @@ async def simulate_market_ticks():
         changed_keys = {
             k for k in market_data if market_data.get(k) != prev_data.get(k)
         }
-        results = await multi_model.compute(instruments, market_data, changed_keys)
+        results = await multi_model.compute(None, market_data, changed_keys)
         for inst_id, val in results.items():
             print(f"{inst_id}: {val}")
         prev_data = market_data
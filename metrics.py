@@ -0,0 +1,110 @@
+import json
+from bisect import bisect_left
+
+# upper bounds, 1us .. ~16s doubling, and 1 .. ~16M doubling
+SECONDS_BUCKETS = tuple(1e-6 * 2 ** i for i in range(25))
+COUNT_BUCKETS = tuple(float(2 ** i) for i in range(25))
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'count', 'sum')
+
+    def __init__(self, buckets=SECONDS_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)     # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th quantile."""
+        rank, seen = q * self.count, 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank and seen:
+                return bound
+        return float('inf') if self.count else 0.0
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "p999": self.quantile(0.999),
+        }
+
+
+class Metrics:
+    """
+    In-process registry of histograms and counters, keyed by name and labels.
+    Components take a Metrics object or None; with None they skip instrumentation entirely.
+    """
+    def __init__(self):
+        self._histograms = {}   # (name, labels) -> Histogram
+        self._counters = {}     # (name, labels) -> number
+
+    def histogram(self, name, buckets=SECONDS_BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        hist = self._histograms.get(key)
+        if hist is None:
+            hist = self._histograms[key] = Histogram(buckets)
+        return hist
+
+    def observe(self, name, value, **labels):
+        self.histogram(name, **labels).observe(value)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        self._counters[key] = self._counters.get(key, 0) + value
+
+    def reset(self):
+        self._histograms.clear()
+        self._counters.clear()
+
+    def snapshot(self):
+        return {
+            "histograms": [
+                {"name": name, "labels": dict(labels), **hist.snapshot()}
+                for (name, labels), hist in self._histograms.items()
+            ],
+            "counters": [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in self._counters.items()
+            ],
+        }
+
+    def to_json(self):
+        return json.dumps(self.snapshot())
+
+    def to_prometheus(self):
+        """Prometheus text exposition format."""
+        lines, typed = [], set()
+
+        def label_str(labels, **extra):
+            items = [*labels, *extra.items()]
+            return '{' + ','.join(f'{k}="{v}"' for k, v in items) + '}' if items else ''
+
+        for (name, labels), hist in sorted(self._histograms.items()):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f'# TYPE {name} histogram')
+            cumulative = 0
+            for bound, count in zip(hist.buckets, hist.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{label_str(labels, le=repr(bound))} {cumulative}')
+            lines.append(f'{name}_bucket{label_str(labels, le="+Inf")} {hist.count}')
+            lines.append(f'{name}_sum{label_str(labels)} {hist.sum}')
+            lines.append(f'{name}_count{label_str(labels)} {hist.count}')
+
+        for (name, labels), value in sorted(self._counters.items()):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f'# TYPE {name} counter')
+            lines.append(f'{name}{label_str(labels)} {value}')
+
+        return '\n'.join(lines) + '\n'
@@ -1,29 +1,267 @@
 import asyncio
+import time
 from collections import defaultdict
+from metrics import COUNT_BUCKETS
 
 class MultiModel:
-    def __init__(self, models):
+    def __init__(self, models, instruments=(), executor=None, metrics=None):
         self.models = models
+        self.executor = executor                                # e.g. ShardedExecutor, None runs models in-process
+        self.metrics = metrics                                  # Metrics, None disables instrumentation
+        self._model_deps = {model: set(model.required_market_data()) for model in models}
+        self._instruments = {}                                  # inst_id -> (inst, deps)
+        self._index = defaultdict(lambda: defaultdict(dict))    # market data key -> model -> {inst_id: inst}
+        self._last_results = {}                                 # model -> {inst_id: result} last streamed
+        if self.executor is not None:
+            self.executor.start(models)
+        self.add_instruments(instruments)
 
-    async def compute(self, instruments, market_data, changed_keys):
-        model_to_insts = defaultdict(list)
+    def add_instruments(self, instruments):
+        """Adds instruments to the book and indexes them by the market data keys they are priced on."""
+        instruments = list(instruments)
+        for inst in instruments:
+            if inst.id in self._instruments:
+                self.remove_instruments([inst])
+            inst_deps = tuple(sorted(set(inst.depends_on())))
+            self._instruments[inst.id] = (inst, inst_deps)
+            for model, model_deps in self._model_deps.items():
+                for key in model_deps.intersection(inst_deps):
+                    self._index[key][model][inst.id] = inst
+        if self.executor is not None:
+            self.executor.add_instruments(instruments)
 
+    def remove_instruments(self, instruments):
+        """Removes instruments (or instrument ids) from the book and the index."""
+        removed = []
         for inst in instruments:
-            inst_deps = set(inst.depends_on())
-            for model in self.models:
-                model_deps = set(model.required_market_data())
-                if inst_deps & model_deps & changed_keys:
-                    model_to_insts[model].append(inst)
+            inst_id = getattr(inst, 'id', inst)
+            entry = self._instruments.pop(inst_id, None)
+            if entry is None:
+                continue
+            removed.append(inst_id)
+            for last in self._last_results.values():
+                last.pop(inst_id, None)
+            _, inst_deps = entry
+            for key in inst_deps:
+                models = self._index.get(key)
+                if not models:
+                    continue
+                for model in list(models):
+                    models[model].pop(inst_id, None)
+                    if not models[model]:
+                        del models[model]
+                if not models:
+                    del self._index[key]
+        if self.executor is not None:
+            self.executor.remove_instruments(removed)
 
-        tasks = [
-            asyncio.create_task(model.compute(insts, market_data))
-            for model, insts in model_to_insts.items()
+    def set_instruments(self, instruments):
+        """Makes the book hold exactly `instruments`, only touching the index for the difference."""
+        instruments = {inst.id: inst for inst in instruments}
+        removed = [
+            inst_id for inst_id, (inst, _) in self._instruments.items()
+            if instruments.get(inst_id) is not inst
         ]
+        self.remove_instruments(removed)
+        self.add_instruments(
+            inst for inst_id, inst in instruments.items() if inst_id not in self._instruments
+        )
+
+    @property
+    def instruments(self):
+        return [inst for inst, _ in self._instruments.values()]
+
+    def dispatch(self, changed_keys):
+        """Returns {model: [instruments]} affected by `changed_keys`, driven by the index."""
+        model_to_insts = {}
+        for key in changed_keys:
+            for model, insts in self._index.get(key, {}).items():
+                model_to_insts.setdefault(model, {}).update(insts)
+        return {
+            model: list(model_to_insts[model].values())
+            for model in self.models if model in model_to_insts
+        }
+
+    async def compute(self, instruments, market_data, changed_keys):
+        # instruments=None prices the registered book; passing a list keeps the old
+        # behaviour but costs a diff of the book against it on every call
+        if instruments is not None:
+            self.set_instruments(instruments)
+
+        metrics = self.metrics
+        if metrics is not None:
+            start = time.perf_counter()
+
+        scheduled = self.schedule(market_data, changed_keys)
+        if metrics is not None:
+            metrics.observe('multimodel_dispatch_seconds', time.perf_counter() - start)
+            merge_time = 0.0
 
         final_result = {}
-        for task in tasks:
-            model_result = await task
-            for inst_id, result in model_result.items():
-                final_result.setdefault(inst_id, {}).update(result)
+        try:
+            for model, cached, task in scheduled:
+                model_result = await self.collect(model, task, market_data)
+                if metrics is not None:
+                    merge_start = time.perf_counter()
+                for inst_id, result in (*cached.items(), *model_result.items()):
+                    final_result.setdefault(inst_id, {}).update(result)
+                if metrics is not None:
+                    merge_time += time.perf_counter() - merge_start
+        finally:
+            # a model that failed (or a cancelled tick) leaves the other models' tasks un-awaited:
+            # running ones are cancelled, the exception of finished ones is marked as retrieved
+            for *_, task in scheduled:
+                if task is None:
+                    continue
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    task.exception()
+
+        if metrics is not None:
+            metrics.observe('multimodel_merge_seconds', merge_time)
+            metrics.observe('multimodel_tick_seconds', time.perf_counter() - start)
+            metrics.histogram('multimodel_tick_instruments', COUNT_BUCKETS).observe(len(final_result))
+            metrics.inc('multimodel_ticks_total')
+
+        return final_result
+
+    async def stream(self, instruments, market_data, changed_keys):
+        """
+        Async iterator variant of compute: yields (model, results) as soon as each model
+        finishes instead of waiting for the slowest one. `results` only holds the instruments
+        whose result changed since the last streamed tick, nothing is yielded for a model
+        whose results are all unchanged.
+        """
+        if instruments is not None:
+            self.set_instruments(instruments)
+
+        pending = {}
+        for model, cached, task in self.schedule(market_data, changed_keys):
+            if task is not None:
+                pending[task] = model
+            # cache hits are available right away
+            delta = self._delta(model, cached)
+            if delta:
+                yield model, delta
+
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    model = pending.pop(task)
+                    delta = self._delta(model, await self.collect(model, task, market_data))
+                    if delta:
+                        yield model, delta
+        finally:
+            # the consumer stopped iterating early
+            for task in pending:
+                task.cancel()
+
+    def schedule(self, market_data, changed_keys):
+        """
+        Starts the work for a tick and returns [(model, cached results, task or None)],
+        with the cache hits already split out of each model's instruments.
+        """
+        return [
+            (model, *self._schedule_model(model, insts, market_data))
+            for model, insts in self.dispatch(changed_keys).items()
+        ]
+
+    def _schedule_model(self, model, insts, market_data):
+        cached = {}
+        if model.cache is not None:
+            cached, insts = self._lookup(model.cache, insts, market_data)
+        task = asyncio.create_task(self._run(model, insts, market_data)) if insts else None
+        return cached, task
+
+    async def compute_scenarios(self, market_data, scenarios):
+        """
+        Prices many market data scenarios (e.g. bumped curves) in one pass.
+
+        `scenarios` maps a scenario name to the market data it overrides in `market_data`.
+        Returns {scenario name: {inst_id: result}}; an instrument only appears under the
+        scenarios that move one of its dependencies, elsewhere it prices as in the base.
+        """
+        # instrument lists are looked up once per (model, moved keys), not once per scenario
+        matched = {}
+        scheduled = []
+        for name, overrides in scenarios.items():
+            scenario_data = {**market_data, **overrides}
+            moved = {key for key, value in overrides.items() if market_data.get(key) != value}
+            for model in self.models:
+                keys = frozenset(self._model_deps[model] & moved)
+                if not keys:
+                    continue
+                if (model, keys) not in matched:
+                    matched[model, keys] = self.dispatch(keys).get(model, [])
+                insts = matched[model, keys]
+                if insts:
+                    scheduled.append((name, model, scenario_data, *self._schedule_model(model, insts, scenario_data)))
+
+        results = {name: {} for name in scenarios}
+        try:
+            for name, model, scenario_data, cached, task in scheduled:
+                model_result = await self.collect(model, task, scenario_data)
+                scenario_result = results[name]
+                for inst_id, result in (*cached.items(), *model_result.items()):
+                    scenario_result.setdefault(inst_id, {}).update(result)
+        finally:
+            for *_, task in scheduled:
+                if task is not None:
+                    task.cancel()
+
+        return results
+
+    async def collect(self, model, task, market_data):
+        """Awaits a task returned by schedule() and stores its results in the model's cache."""
+        if task is None:
+            return {}
+        model_result = await task
+        if model.cache is not None:
+            self._store(model.cache, model_result, market_data)
+        return model_result
+
+    def _delta(self, model, model_result):
+        last = self._last_results.setdefault(model, {})
+        delta = {
+            inst_id: result for inst_id, result in model_result.items()
+            if last.get(inst_id) != result
+        }
+        last.update(delta)
+        return delta
+
+    def _run(self, model, insts, market_data):
+        if self.executor is not None:
+            coro = self.executor.compute(model, insts, market_data)
+        else:
+            coro = model.compute(insts, market_data)
+        if self.metrics is not None:
+            return self._timed(model, coro, len(insts))
+        return coro
+
+    async def _timed(self, model, coro, count):
+        start = time.perf_counter()
+        try:
+            return await coro
+        finally:
+            name = type(model).__name__
+            self.metrics.observe('model_compute_seconds', time.perf_counter() - start, model=name)
+            self.metrics.inc('model_instruments_priced_total', count, model=name)
+
+    def _lookup(self, cache, insts, market_data):
+        """Splits `insts` into results found in `cache` and instruments that still need pricing."""
+        cached, missing = {}, []
+        for inst in insts:
+            result = cache.get(cache.key(inst.id, self._instruments[inst.id][1], market_data))
+            if result is None:
+                missing.append(inst)
+            else:
+                cached[inst.id] = result
+        return cached, missing
 
-        return final_result
\ No newline at end of file
+    def _store(self, cache, model_result, market_data):
+        for inst_id, result in model_result.items():
+            if inst_id not in self._instruments:
+                continue
+            cache.put(cache.key(inst_id, self._instruments[inst_id][1], market_data), result)
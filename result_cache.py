@@ -0,0 +1,40 @@
+from collections import OrderedDict
+
+class ResultCache:
+    """
+    Size bounded LRU cache of a model's per-instrument results, keyed by the instrument
+    and the values of the market data keys it depends on. Market data values must be hashable.
+    """
+    def __init__(self, maxsize=100_000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def key(inst_id, inst_deps, market_data):
+        return (inst_id, tuple(market_data.get(key) for key in inst_deps))
+
+    def get(self, key):
+        result = self._entries.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return result
+
+    def put(self, key, result):
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self), "maxsize": self.maxsize}
+
+    def __len__(self):
+        return len(self._entries)
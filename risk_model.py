@@ -1,7 +1,14 @@
 from abc import ABC, abstractmethod
+import numpy as np
 from env import Env
 
 class RiskModel(ABC):
+    cache = None
+
+    def __init__(self, cache=None):
+        # opt-in ResultCache that MultiModel consults before scheduling this model
+        self.cache = cache
+
     @abstractmethod
     def required_market_data(self):
         pass
@@ -10,26 +17,52 @@ class RiskModel(ABC):
     async def compute(self, instruments, market_data):
         pass
 
+    def price_batch(self, book, market_data):
+        """
+        Prices every row of an InstrumentBook (or a slice of one) and returns a float
+        array aligned with `book.ids`. Rows of instruments the model does not price (none of
+        the keys they depend on is in required_market_data()) are NaN, `book.depending_on`
+        gives the slice that only holds priced rows. Models override this with a vectorized
+        version, the default goes through Instrument.Price one row at a time.
+        """
+        with Env(**{key: market_data[key] for key in self.required_market_data()}):
+            prices = np.fromiter(
+                (inst.Price() for inst in book.instruments()), dtype=float, count=len(book)
+            )
+        return self._unpriced_as_nan(book, prices)
+
+    def _unpriced_as_nan(self, book, prices):
+        prices[~np.isin(book.types, book.type_codes(self.required_market_data()))] = np.nan
+        return prices
+
 class DiscountCurveModel(RiskModel):
     def required_market_data(self):
         return ["DiscountCurve"]
 
     async def compute(self, instruments, market_data):
         results = {}
-        for inst in instruments:
-            with Env(DiscountCurve=market_data["DiscountCurve"]):
+        # one scope for the whole batch rather than one per instrument
+        with Env(DiscountCurve=market_data["DiscountCurve"]):
+            for inst in instruments:
                 price = inst.Price()
                 results[inst.id] = {"price": price}
         return results
 
+    def price_batch(self, book, market_data):
+        return self._unpriced_as_nan(book, book.price({"DiscountCurve": market_data["DiscountCurve"]}))
+
 class ForwardCurveModel(RiskModel):
     def required_market_data(self):
         return ["ForwardCurve"]
 
     async def compute(self, instruments, market_data):
         results = {}
-        for inst in instruments:
-            with Env(ForwardCurve=market_data["ForwardCurve"]):
+        # one scope for the whole batch rather than one per instrument
+        with Env(ForwardCurve=market_data["ForwardCurve"]):
+            for inst in instruments:
                 price = inst.Price()
                 results[inst.id] = {"price": price}
-        return results
\ No newline at end of file
+        return results
+
+    def price_batch(self, book, market_data):
+        return self._unpriced_as_nan(book, book.price({"ForwardCurve": market_data["ForwardCurve"]}))
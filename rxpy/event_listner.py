@@ -1,13 +1,92 @@
 import os
 import shutil
+import struct
 import asyncio
+import ctypes
+import ctypes.util
 from logging_utils import logger
 
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+_INOTIFY_EVENT = struct.Struct('iIII')     # wd, mask, cookie, len, followed by len bytes of name
+
+
+class Inotify:
+    """Minimal ctypes binding of Linux inotify: files closed after writing or moved into one directory."""
+
+    def __init__(self, dirPath):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        if libc.inotify_add_watch(self.fd, os.fsencode(dirPath), IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f'inotify_add_watch failed on {dirPath}')
+        self._names = {}            # names reported and not taken yet, in order
+        self._overflowed = False
+
+    @classmethod
+    def open(cls, dirPath):
+        """Returns None where inotify is not available (not Linux, no watches left...)."""
+        try:
+            return cls(dirPath)
+        except (OSError, AttributeError) as ex:
+            logger.info(f'inotify not available for {dirPath} ({ex}), polling instead')
+            return None
+
+    def collect(self):
+        """
+        Drains the fd into the names not taken yet. Meant as the add_reader callback: the selector is
+        level-triggered, an fd left readable would wake the event loop on every iteration.
+        """
+        names = self.read()
+        if names is None:
+            self._overflowed = True
+        else:
+            self._names.update(dict.fromkeys(names))
+
+    def take(self):
+        """Names collected since the last take, None if the kernel dropped events in between."""
+        names = None if self._overflowed else list(self._names)
+        self._names, self._overflowed = {}, False
+        return names
+
+    def read(self):
+        """Names of the files reported since the last read, None if the kernel dropped events."""
+        names, overflow = [], False
+        while True:
+            try:
+                buf = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(buf):
+                _, mask, _, length = _INOTIFY_EVENT.unpack_from(buf, offset)
+                offset += _INOTIFY_EVENT.size
+                if mask & IN_Q_OVERFLOW:
+                    overflow = True
+                elif length:
+                    names.append(os.fsdecode(buf[offset:offset + length].rstrip(b'\0')))
+                offset += length
+        return None if overflow else names
+
+    def close(self):
+        os.close(self.fd)
+
 
 class DirectoryListner:
     @staticmethod
     async def watch_directory(dirPath, stream, parse_fn, poll_interval=0.1):
-        """Polls a directory and pushes new events into the given stream."""
+        """
+        Pushes the events parsed from the .txt files dropped in a directory into the given stream,
+        moving each file to done/ (or error/ if it could not be parsed).
+
+        On Linux the directory is watched with inotify and the task only wakes up when files are
+        written or moved in; elsewhere it is polled every `poll_interval` seconds. Files are read,
+        parsed and moved in batches on a worker thread, the stream is then fed on the event loop.
+        """
 
         if not os.path.exists(os.path.join(dirPath, 'done')):
             os.mkdir(os.path.join(dirPath, 'done'))
@@ -15,40 +94,106 @@ class DirectoryListner:
         if not os.path.exists(os.path.join(dirPath, 'error')):
             os.mkdir(os.path.join(dirPath, 'error'))
 
-        def readfiles():
-            fileNames = [path for path in os.listdir(
-                dirPath) if path.endswith('.txt')]
-            if fileNames:
-                logger.info('Processing {} {}...'.format(
-                    len(fileNames), dirPath.split('/')[-1]))
+        def readfiles(fileNames):
+            # runs on a worker thread, parse_fn included
+            logger.info('Processing {} {}...'.format(
+                len(fileNames), dirPath.split('/')[-1]))
 
+            events = []
             for fileName in fileNames:
                 filePath = os.path.join(dirPath, fileName)
                 try:
                     with open(filePath, "r") as f:
                         data = f.read().strip()
                         if data:
-                            event = parse_fn(data)
-                            stream.on_next(event)
+                            events.append(parse_fn(data))
                     shutil.move(filePath, os.path.join(
                         dirPath, 'done', fileName))
+                except FileNotFoundError:
+                    # already picked up, e.g. reported by both the startup scan and inotify
+                    continue
                 except Exception as ex:
                     logger.exception(ex)
-                    shutil.move(filePath, os.path.join(
-                        dirPath, 'error', fileName))
-                except asyncio.exceptions.CancelledError as cancelled_error:
-                    logger.exception(cancelled_error)
-                    shutil.move(filePath, os.path.join(
-                        dirPath, 'error', fileName))
-                    raise cancelled_error
+                    try:
+                        shutil.move(filePath, os.path.join(
+                            dirPath, 'error', fileName))
+                    except OSError as move_error:
+                        # e.g. the file disappeared meanwhile, one bad file must not stop the watcher
+                        logger.exception(move_error)
+            return events
+
+        async def process(fileNames):
+            batch = asyncio.ensure_future(asyncio.to_thread(readfiles, fileNames))
+            try:
+                events = await asyncio.shield(batch)
+            except asyncio.CancelledError:
+                # the batch's files are already moving to done/, deliver their events before stopping
+                for event in await batch:
+                    stream.on_next(event)
+                raise
+            for event in events:
+                stream.on_next(event)
+
+        loop = asyncio.get_running_loop()
+        inotify = Inotify.open(dirPath)
+        if inotify is not None:
+            wakeup = asyncio.Event()
+
+            def on_readable():
+                inotify.collect()
+                wakeup.set()
+            try:
+                loop.add_reader(inotify.fd, on_readable)
+            except NotImplementedError:
+                # event loops without add_reader (e.g. the proactor loop)
+                inotify.close()
+                inotify = None
+
+        if inotify is None:
+            batches = DirectoryListner._poll(dirPath, poll_interval)
+        else:
+            batches = DirectoryListner._notified(dirPath, inotify, wakeup)
 
+        try:
+            async for fileNames in batches:
+                await process(fileNames)
+        finally:
+            # releases the inotify fd right away rather than when the generator is collected
+            await batches.aclose()
+
+    @staticmethod
+    def _txtFiles(names):
+        return [name for name in names if name.endswith('.txt')]
+
+    @staticmethod
+    async def _poll(dirPath, poll_interval):
         while True:
             try:
-                readfiles()
+                fileNames = DirectoryListner._txtFiles(os.listdir(dirPath))
             except FileNotFoundError:
-                pass
+                fileNames = []
+            if fileNames:
+                yield fileNames
             await asyncio.sleep(poll_interval)
 
+    @staticmethod
+    async def _notified(dirPath, inotify, wakeup):
+        try:
+            # files dropped before the watch started
+            fileNames = DirectoryListner._txtFiles(os.listdir(dirPath))
+            while True:
+                if fileNames:
+                    yield fileNames
+                await wakeup.wait()
+                wakeup.clear()
+                names = inotify.take()
+                # rescan when the kernel queue overflowed
+                fileNames = DirectoryListner._txtFiles(
+                    os.listdir(dirPath) if names is None else dict.fromkeys(names))
+        finally:
+            asyncio.get_running_loop().remove_reader(inotify.fd)
+            inotify.close()
+
     @classmethod
     def task(cls, dirPath, stream, parse_fn, poll_interval=0.1):
         return asyncio.create_task(cls().watch_directory(dirPath, stream, parse_fn, poll_interval=poll_interval))
@@ -0,0 +1,244 @@
+import os
+import asyncio
+import threading
+import multiprocessing as mp
+from collections import defaultdict
+from enum import Enum
+
+
+class Phase(Enum):
+    ADD = 1
+    REMOVE = 2
+    COMPUTE = 3
+
+
+class WorkerDiedError(RuntimeError):
+    """A worker process exited, the computations it owned will never complete."""
+
+
+class ShardedExecutor:
+    """
+    Persistent pool of worker processes that run RiskModel.compute on shards of the book.
+    Each instrument is owned by one worker and shipped to it once, when it is added;
+    on a tick only instrument ids and the market data cross the process boundary.
+    A worker found dead is restarted on the next call and its instruments are shipped to it again;
+    the computations it owned when it died fail with WorkerDiedError.
+    """
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count()
+        self._models = {}                       # model -> index in the worker's model list
+        self._instruments = {}                  # inst_id -> instrument, to ship a shard again to a restarted worker
+        self._procs = []
+        self._conns = []
+        self._owner = {}                        # inst_id -> worker index
+        self._next_worker = 0
+        self._request_id = 0
+        self._pending = {}                      # request id -> (worker connection, future)
+        self._dead = set()                      # indices of the workers whose connection closed
+        self._lock = threading.Lock()           # guards _pending, _dead and _conns, shared with the reader threads
+        self._readers = []
+
+    def start(self, models):
+        self._models = {model: i for i, model in enumerate(models)}
+        self._procs = [None] * self.workers
+        self._conns = [None] * self.workers
+        self._readers = [None] * self.workers
+        for worker in range(self.workers):
+            self._spawn(worker)
+
+    def _spawn(self, worker):
+        parent_conn, child_conn = mp.Pipe(duplex=True)
+        p = mp.Process(target=self.worker_loop, args=(child_conn, list(self._models)), daemon=True)
+        p.start()
+        child_conn.close()
+        # one blocking recv per worker on its own thread: readers are not tied to an event loop,
+        # each result is handed to the loop of the compute() call waiting for it
+        reader = threading.Thread(target=self._reader, args=(worker, parent_conn),
+                                  name=f'shard-reader-{worker}', daemon=True)
+        with self._lock:
+            self._procs[worker] = p
+            self._conns[worker] = parent_conn
+            self._readers[worker] = reader
+            self._dead.discard(worker)
+        reader.start()
+
+    def _restart(self, worker):
+        """Replaces a dead worker and ships it the instruments it owned."""
+        old = self._procs[worker]
+        old.join(timeout=1)
+        if old.is_alive():
+            old.kill()
+        self._spawn(worker)
+        shard = [self._instruments[inst_id] for inst_id, owner in self._owner.items() if owner == worker]
+        if shard:
+            self._conns[worker].send((Phase.ADD, shard))
+
+    def _restart_dead(self):
+        with self._lock:
+            dead = sorted(self._dead)
+        for worker in dead:
+            self._restart(worker)
+
+    def _send(self, worker, msg):
+        """
+        Sends msg to a worker, False if its process turned out to be gone: it is restarted then,
+        with its shard as of now, and msg is not delivered.
+        """
+        try:
+            self._conns[worker].send(msg)
+            return True
+        except OSError:
+            self._restart(worker)
+            return False
+
+    @staticmethod
+    def worker_loop(conn, models):
+        instruments = {}
+        loop = asyncio.new_event_loop()
+
+        while True:
+            try:
+                msg = conn.recv()
+            except EOFError:
+                break
+
+            if msg is None:
+                break
+
+            phase, payload = msg
+
+            if phase == Phase.ADD:
+                instruments.update((inst.id, inst) for inst in payload)
+
+            elif phase == Phase.REMOVE:
+                for inst_id in payload:
+                    instruments.pop(inst_id, None)
+
+            elif phase == Phase.COMPUTE:
+                request_id, model_idx, inst_ids, market_data = payload
+                try:
+                    result = loop.run_until_complete(
+                        models[model_idx].compute([instruments[i] for i in inst_ids], market_data))
+                except Exception as ex:
+                    result = ex
+                try:
+                    conn.send((request_id, result))
+                except Exception as ex:
+                    # e.g. an exception or result that cannot be pickled, report it rather than dying
+                    conn.send((request_id, RuntimeError(f'worker could not send its result: {ex!r}')))
+
+        loop.close()
+        conn.close()
+
+    def add_instruments(self, instruments):
+        self._restart_dead()
+        shards = defaultdict(list)
+        for inst in instruments:
+            worker = self._owner.get(inst.id)
+            if worker is None:
+                worker = self._next_worker
+                self._next_worker = (self._next_worker + 1) % self.workers
+                self._owner[inst.id] = worker
+            self._instruments[inst.id] = inst
+            shards[worker].append(inst)
+
+        for worker, insts in shards.items():
+            # a worker restarted by _send already received these with the rest of its shard
+            self._send(worker, (Phase.ADD, insts))
+
+    def remove_instruments(self, inst_ids):
+        self._restart_dead()
+        shards = defaultdict(list)
+        for inst_id in inst_ids:
+            worker = self._owner.pop(inst_id, None)
+            self._instruments.pop(inst_id, None)
+            if worker is not None:
+                shards[worker].append(inst_id)
+
+        for worker, ids in shards.items():
+            self._send(worker, (Phase.REMOVE, ids))
+
+    async def compute(self, model, instruments, market_data):
+        """Same contract as model.compute, with the work split across the workers owning `instruments`."""
+        shards = defaultdict(list)
+        for inst in instruments:
+            shards[self._owner[inst.id]].append(inst.id)
+
+        # workers are brought back before anything is registered, a dead one would fail the tick
+        self._restart_dead()
+        model_idx = self._models[model]
+        loop = asyncio.get_running_loop()
+        futures = []
+        for worker, inst_ids in shards.items():
+            self._request_id += 1
+            request_id = self._request_id
+            future = loop.create_future()
+            with self._lock:
+                self._pending[request_id] = (self._conns[worker], future)
+            if not self._send(worker, (Phase.COMPUTE, (request_id, model_idx, inst_ids, market_data))):
+                with self._lock:
+                    self._pending.pop(request_id, None)
+                future.set_exception(WorkerDiedError(f'shard worker {worker} exited, restarted'))
+            futures.append(future)
+
+        # every shard is awaited before raising, none of their exceptions is left unretrieved
+        results = {}
+        for shard_result in await asyncio.gather(*futures, return_exceptions=True):
+            if isinstance(shard_result, BaseException):
+                raise shard_result
+            results.update(shard_result)
+        return results
+
+    def _reader(self, worker, conn):
+        while True:
+            try:
+                request_id, result = conn.recv()
+            except (EOFError, OSError):
+                break
+            with self._lock:
+                _, future = self._pending.pop(request_id, (None, None))
+            if future is not None:
+                self._resolve(future, result)
+
+        # the worker is gone: fail whatever it still owed instead of leaving the tick waiting forever.
+        # A worker already restarted (its connection replaced) is not marked dead again
+        with self._lock:
+            if self._conns[worker] is conn:
+                self._dead.add(worker)
+            owed = [rid for rid, (owner, _) in self._pending.items() if owner is conn]
+            futures = [self._pending.pop(rid)[1] for rid in owed]
+        conn.close()
+        for future in futures:
+            self._resolve(future, WorkerDiedError(f'shard worker {worker} exited'))
+
+    @staticmethod
+    def _resolve(future, result):
+        def set_result():
+            # the future is done if the caller was cancelled (e.g. a superseded tick)
+            if future.done():
+                return
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+        try:
+            future.get_loop().call_soon_threadsafe(set_result)
+        except RuntimeError:
+            pass    # the loop of that compute() call is closed, nobody is waiting any more
+
+    def shutdown(self):
+        for conn in self._conns:
+            try:
+                conn.send(None)  # signal to stop worker
+            except Exception:
+                pass
+
+        for p in self._procs:
+            p.join()
+
+        # the readers exit on the EOF of their worker's connection
+        for reader in self._readers:
+            reader.join()
+
+        for conn in self._conns:
+            conn.close()
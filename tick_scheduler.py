@@ -0,0 +1,101 @@
+import asyncio
+import time
+
+class TickScheduler:
+    """
+    Drives a MultiModel from a bursty market data feed.
+
+    Ticks submitted while a previous tick is being computed are conflated: the latest market
+    data wins and the changed keys are merged, so at most one tick is waiting at any time.
+    When a new tick overwrites keys an in-flight model is pricing off, that model's task is
+    cancelled and its changed keys are carried over to the next dispatch.
+    """
+    def __init__(self, multi_model, on_result, conflation_window=0.0):
+        self.multi_model = multi_model
+        self.on_result = on_result                  # called with (market_data, final_result), may be async
+        self.conflation_window = conflation_window  # seconds to keep collecting ticks before dispatching
+        self._market_data = None
+        self._changed_keys = set()
+        self._ready = asyncio.Event()
+        self._inflight = {}                         # task -> model
+        self._inflight_keys = set()
+        self._superseded = set()                    # in-flight tasks cancelled by _supersede
+        self._first_submitted = None                # when the oldest tick folded into the queued one arrived
+        self.ticks_submitted = 0
+        self.ticks_dispatched = 0
+        self.tasks_superseded = 0
+
+    def submit(self, market_data, changed_keys):
+        """Queues a tick, `market_data` is the full market state and replaces any queued one."""
+        changed_keys = set(changed_keys)
+        if self._first_submitted is None:
+            self._first_submitted = time.perf_counter()
+        self._market_data = market_data
+        self._changed_keys |= changed_keys
+        self.ticks_submitted += 1
+        if self.multi_model.metrics is not None:
+            self.multi_model.metrics.inc('scheduler_ticks_submitted_total')
+        self._supersede(changed_keys)
+        self._ready.set()
+
+    def _supersede(self, changed_keys):
+        for task, model in self._inflight.items():
+            if task.done():
+                continue
+            model_deps = set(model.required_market_data())
+            if model_deps & changed_keys:
+                task.cancel()
+                self._superseded.add(task)
+                self.tasks_superseded += 1
+                if self.multi_model.metrics is not None:
+                    self.multi_model.metrics.inc('scheduler_tasks_superseded_total')
+                # whatever this model was repricing has to be repriced against the newer data
+                self._changed_keys |= self._inflight_keys & model_deps
+
+    async def run(self):
+        while True:
+            await self._ready.wait()
+            if self.conflation_window:
+                await asyncio.sleep(self.conflation_window)
+            self._ready.clear()
+
+            market_data, changed_keys = self._market_data, self._changed_keys
+            submitted, self._first_submitted = self._first_submitted, None
+            self._changed_keys = set()
+            self.ticks_dispatched += 1
+
+            final_result = await self._dispatch(market_data, changed_keys)
+            metrics = self.multi_model.metrics
+            if metrics is not None:
+                metrics.observe('scheduler_tick_to_result_seconds', time.perf_counter() - submitted)
+                metrics.inc('scheduler_ticks_dispatched_total')
+            if final_result:
+                res = self.on_result(market_data, final_result)
+                if asyncio.iscoroutine(res):
+                    await res
+
+    async def _dispatch(self, market_data, changed_keys):
+        scheduled = self.multi_model.schedule(market_data, changed_keys)
+        self._inflight = {task: model for model, _, task in scheduled if task is not None}
+        self._inflight_keys = changed_keys
+
+        final_result = {}
+        try:
+            for model, cached, task in scheduled:
+                try:
+                    model_result = await self.multi_model.collect(model, task, market_data)
+                except asyncio.CancelledError:
+                    # only a supersede is swallowed, cancelling run() cancels the awaited task too
+                    if task not in self._superseded:
+                        raise
+                    # superseded, its keys were merged into the next tick
+                    continue
+                for inst_id, result in (*cached.items(), *model_result.items()):
+                    final_result.setdefault(inst_id, {}).update(result)
+        finally:
+            for task in self._inflight:
+                task.cancel()
+            self._inflight = {}
+            self._superseded.clear()
+
+        return final_result